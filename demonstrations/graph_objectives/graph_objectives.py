@@ -0,0 +1,127 @@
+""" Diagonal cost tables for combinatorial optimization problems on graphs.
+
+The cost Hamiltonians of MaxCut, MaxClique, maximum independent set and similar
+problems are diagonal in the computational basis. Instead of evaluating them term
+by term, we tabulate their values for all 2**n computational basis states once.
+Afterwards, the cost of a bitstring is a single lookup, the costs of many samples
+are obtained by indexing, and the expectation value is the dot product of the table
+with the output probabilities of a circuit.
+
+Basis states are encoded as integers, with the first wire as the most significant bit.
+This matches the ordering of ``qml.probs`` and ``qml.sample``.
+"""
+import pennylane as qml
+import numpy as np
+
+
+def bitstrings_to_int(bitstrings):
+    """Convert bitstrings to their integer encoding.
+    Args:
+        bitstrings (array[int]) : bitstrings along the last axis, with the first
+                                  bit being the most significant one
+    Returns:
+        array[int]              : integer encoding of each bitstring
+    """
+    bitstrings = np.asarray(bitstrings, dtype=np.int64)
+    n_bits = bitstrings.shape[-1]
+    return bitstrings @ (1 << np.arange(n_bits - 1, -1, -1))
+
+
+def packed_bit_planes(n_wires):
+    """Bit planes of all computational basis states, packed into 64-bit words.
+    Row i holds bit i (the bit of wire i) of all 2**n_wires basis states, such
+    that 64 basis states are processed with a single bitwise operation.
+    Args:
+        n_wires (int)      : number of wires
+    Returns:
+        array[uint64]      : packed bit planes of shape (n_wires, ceil(2**n_wires / 64))
+    """
+    num_states = 2**n_wires
+    num_bytes = -(-num_states // 8)
+    planes = np.zeros((n_wires, -(-num_bytes // 8) * 8), dtype=np.uint8)
+    for wire in range(n_wires):
+        period = 2 ** (n_wires - 1 - wire)
+        bits = np.tile(np.repeat(np.array([0, 1], dtype=np.uint8), period), 2**wire)
+        planes[wire, :num_bytes] = np.packbits(bits, bitorder="little")
+    return planes.view(np.uint64)
+
+
+def unpack_bit_plane(plane, n_wires):
+    """Unpack a packed bit plane into one bit per computational basis state."""
+    return np.unpackbits(plane.view(np.uint8), bitorder="little")[: 2**n_wires]
+
+
+def cut_table(graph, wires=None):
+    """Number of cut edges of an unweighted graph for all computational basis states.
+    The cut indicators of an edge are the XOR of the bit planes of its two nodes,
+    and they are summed up in a bit-sliced counter, so that the whole table is
+    built with O(2**n * |E| / 64) word operations (up to a logarithmic factor).
+    Args:
+        graph (nx.Graph)   : graph of the MaxCut problem
+        wires (list)       : order of the nodes on the wires, defaults to graph.nodes
+    Returns:
+        array[int]         : number of edges cut by each basis state
+    """
+    wires = list(graph.nodes) if wires is None else list(wires)
+    wire_map = {w: i for i, w in enumerate(wires)}
+    planes = packed_bit_planes(len(wires))
+
+    # counter[b] holds bit b of the running number of cut edges of all basis states
+    counter = []
+    for u, v in graph.edges:
+        carry = planes[wire_map[u]] ^ planes[wire_map[v]]
+        for b in range(len(counter)):
+            counter[b], carry = counter[b] ^ carry, counter[b] & carry
+        if carry.any():
+            counter.append(carry)
+
+    table = np.zeros(2 ** len(wires), dtype=np.int64)
+    for b, plane in enumerate(counter):
+        table += unpack_bit_plane(plane, len(wires)).astype(np.int64) << b
+    return table
+
+
+def diagonal_table(hamiltonian, wires):
+    """Values of a Hamiltonian consisting of Pauli-Z words for all computational
+    basis states, such as the cost Hamiltonians from the ``qml.qaoa`` module.
+    Args:
+        hamiltonian (qml.Hamiltonian) : diagonal Hamiltonian
+        wires (list)                  : wire order of the basis states
+    Returns:
+        array[float]                  : diagonal of the Hamiltonian
+    """
+    wires = list(wires)
+    wire_map = {w: i for i, w in enumerate(wires)}
+    planes = packed_bit_planes(len(wires))
+
+    table = np.zeros(2 ** len(wires))
+    for coeff, op in zip(hamiltonian.coeffs, hamiltonian.ops):
+        word = qml.pauli.pauli_word_to_string(op, wire_map=wire_map)
+        if set(word) - {"I", "Z"}:
+            raise ValueError(f"The term {op} is not diagonal in the computational basis.")
+        parity = np.zeros_like(planes[0])
+        for i, letter in enumerate(word):
+            if letter == "Z":
+                parity ^= planes[i]
+        signs = 1.0 - 2.0 * unpack_bit_plane(parity, len(wires))
+        table += float(qml.math.toarray(coeff)) * signs
+    return table
+
+
+def evaluate(samples, table):
+    """Costs of a batch of samples, e.g., the output of ``qml.sample``.
+    Args:
+        samples (array[int]) : bitstrings along the last axis
+        table (array)        : cost table of the problem
+    Returns:
+        array                : cost of each sample
+    """
+    return table[bitstrings_to_int(samples)]
+
+
+def expectation(probs, table):
+    """Exact expectation value of a diagonal cost from computational basis probabilities.
+    Works with all interfaces supported by ``qml.math``. A batch of probabilities of
+    shape (batch, 2**n) is contracted either with a single table or with one table per
+    batch element, given as an array of shape (batch, 2**n)."""
+    return qml.math.sum(probs * qml.math.cast_like(table, probs), axis=-1)
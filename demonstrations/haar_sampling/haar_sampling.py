@@ -0,0 +1,68 @@
+""" Batched sampling of Haar-random unitaries and single-qubit Bloch vectors.
+
+Haar-random unitaries are drawn with the QR decomposition of Ginibre matrices
+[Mezzadri, arXiv:math-ph/0609050]. Instead of decomposing one matrix at a time, a
+whole stack of shape (batch_size, N, N) is decomposed with a single call to
+``np.linalg.qr``, and the phase correction Q -> Q diag(R_ii / |R_ii|) is applied
+by broadcasting the normalized diagonal of R over the columns of Q. Large numbers
+of high-dimensional unitaries are generated in chunks of bounded memory.
+"""
+import numpy as np
+
+PAULIS = np.array([[[0, 1], [1, 0]], [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]])
+
+
+def haar_unitaries(N, batch_size=None, rng=None, fix_phases=True):
+    """Haar-random unitaries from the QR decomposition of Ginibre matrices.
+    Args:
+        N (int)                 : dimension of the unitaries
+        batch_size (int)        : number of unitaries, a single one if None
+        rng (int or Generator)  : seed or random number generator
+        fix_phases (bool)       : whether to apply the phase correction; without it
+                                  the unitaries are *not* Haar-random
+    Returns:
+        array[complex]          : unitaries of shape (batch_size, N, N), or (N, N)
+    """
+    rng = np.random.default_rng(rng)
+    shape = (N, N) if batch_size is None else (batch_size, N, N)
+    Z = rng.standard_normal(shape) + 1j * rng.standard_normal(shape)
+
+    Q, R = np.linalg.qr(Z)
+    if not fix_phases:
+        return Q
+
+    # Multiplying by a diagonal matrix from the right rescales the columns of Q
+    diag = np.diagonal(R, axis1=-2, axis2=-1)
+    return Q * (diag / np.abs(diag))[..., np.newaxis, :]
+
+
+def haar_unitary_chunks(N, num_samples, chunk_size=100, rng=None, fix_phases=True):
+    """Generate a large number of Haar-random unitaries in chunks.
+    Args:
+        N (int)                 : dimension of the unitaries
+        num_samples (int)       : total number of unitaries
+        chunk_size (int)        : maximal number of unitaries per chunk
+        rng (int or Generator)  : seed or random number generator
+        fix_phases (bool)       : whether to apply the phase correction
+    Yields:
+        array[complex]          : unitaries of shape (chunk_size, N, N), the last
+                                  chunk holding the remaining ones
+    """
+    rng = np.random.default_rng(rng)
+    for start in range(0, num_samples, chunk_size):
+        size = min(chunk_size, num_samples - start)
+        yield haar_unitaries(N, size, rng=rng, fix_phases=fix_phases)
+
+
+def density_matrices_to_bloch_vectors(rhos):
+    """Bloch vectors (Tr(rho X), Tr(rho Y), Tr(rho Z)) of single-qubit density
+    matrices of shape (..., 2, 2), computed with a single contraction."""
+    return np.einsum("...ij,kji->...k", rhos, PAULIS).real
+
+
+def states_to_bloch_vectors(states):
+    """Bloch vectors of single-qubit state vectors of shape (..., 2), e.g., the
+    first columns U[..., :, 0] of a stack of unitaries applied to |0>."""
+    a, b = states[..., 0], states[..., 1]
+    coherence = 2 * np.conj(a) * b
+    return np.stack([coherence.real, coherence.imag, np.abs(a) ** 2 - np.abs(b) ** 2], axis=-1)
@@ -11,7 +11,7 @@ Learning to learn with quantum neural networks
    tutorial_qaoa_intro Intro to QAOA
    tutorial_qaoa_maxcut QAOA for MaxCut problem
 
-*Author: Stefano Mangini — Posted: 02 March 2021. Last updated: 15 September 2021.*
+*Author: Stefano Mangini — Posted: 02 March 2021. Last updated: 18 October 2026.*
 
 
 In this demo we recreate the architecture proposed
@@ -210,6 +210,17 @@ nx.draw(graphs[0])
 # PennyLane’s ``qaoa`` module, we will able to create fully functioning
 # quantum circuits for the MaxCut problem, with very few lines of code.
 #
+# The MaxCut cost Hamiltonian only contains :math:`Z` and :math:`ZZ` terms, so
+# it is diagonal in the computational basis. Rather than measuring it term by
+# term in every call of the circuit, we tabulate its value for all
+# :math:`2^n` bitstrings once per graph with the helper module
+# :download:`graph_objectives.py </demonstrations/graph_objectives/graph_objectives.py>`.
+# The circuit then returns the probabilities of the computational basis
+# states, and the exact expectation value is their dot product with the
+# table, which TensorFlow differentiates like any other tensor operation.
+#
+
+from graph_objectives.graph_objectives import diagonal_table, expectation
 
 
 def qaoa_from_graph(graph, n_layers=1):
@@ -221,6 +232,9 @@ def qaoa_from_graph(graph, n_layers=1):
     # Define the structure of the cost and mixer subcircuits for the MaxCut problem
     cost_h, mixer_h = qaoa.maxcut(graph)
 
+    # Values of the cost Hamiltonian for all computational basis states
+    cost_table = diagonal_table(cost_h, wires)
+
     # Defines a layer of the QAOA ansatz from the cost and mixer Hamiltonians
     def qaoa_layer(gamma, alpha):
         qaoa.cost_layer(gamma, cost_h)
@@ -231,19 +245,21 @@ def qaoa_from_graph(graph, n_layers=1):
         for w in wires:
             qml.Hadamard(wires=w)
         qml.layer(qaoa_layer, n_layers, params[0], params[1])
-        return qml.expval(cost_h)
+        return qml.probs(wires=wires)
+
+    # We set the default.qubit.tf device for seamless integration with TensorFlow
+    dev = qml.device("default.qubit.tf", wires=len(graph.nodes))
+
+    # This qnode evaluates the probabilities of the computational basis states.
+    # It is created once per graph and reused in every call of the cost function.
+    probs = qml.QNode(circuit, dev, interface="tf", diff_method="backprop")
 
     # Evaluates the cost Hamiltonian
     def hamiltonian(params, **kwargs):
         """Evaluate the cost Hamiltonian, given the angles and the graph."""
 
-        # We set the default.qubit.tf device for seamless integration with TensorFlow
-        dev = qml.device("default.qubit.tf", wires=len(graph.nodes))
-
-        # This qnode evaluates the expectation value of the cost hamiltonian operator
-        cost = qml.QNode(circuit, dev, interface="tf", diff_method="backprop")
-
-        return cost(params)
+        # Expectation value of the cost Hamiltonian
+        return expectation(probs(params), cost_table)
 
     return hamiltonian
 
@@ -522,6 +538,220 @@ for epoch in range(epochs):
 #
 
 
+######################################################################
+# **Batched training over many graphs**
+#
+#
+# The training loop above visits one graph at a time. Every call of
+# ``rnn_iteration`` evaluates a single circuit, so one epoch over
+# the 20 graphs requires :math:`20 \times 5 = 100` sequential circuit
+# executions. Since all graphs in the dataset have the same number of
+# nodes, we can instead stack them into a batch and let the LSTM suggest
+# parameters for all of them at once, working on tensors of shape
+# ``(batch, 2 * n_layers)``.
+#
+# On the quantum side, we make use of the fact that the cost layer
+# :math:`e^{-i\gamma H_C}` of MaxCut is diagonal in the computational
+# basis. Using the cost tables from before, it is a ``DiagonalQubitUnitary``
+# gate whose diagonal depends on the graph, while the mixer
+# layer :math:`e^{-i\alpha H_M}` is the same for all graphs and is given by
+# ``RX`` rotations with angle :math:`2\alpha`. Passing the stacked
+# diagonals and angles to the circuit makes use of PennyLane's parameter
+# broadcasting, such that all graphs are simulated within a single
+# execution. The tables and the QNode are built once, when the batched
+# cost function is created.
+#
+
+
+def qaoa_from_graphs(graphs, n_layers=1):
+    """Uses QAOA to create a batched cost function for the MaxCut problem on a set of graphs."""
+
+    n_nodes = len(graphs[0].nodes)
+    if any(len(g.nodes) != n_nodes for g in graphs):
+        raise ValueError("All graphs in a batch must have the same number of nodes.")
+    wires = range(n_nodes)
+
+    # Values of the cost Hamiltonians for all computational basis states, one row per graph
+    cost_tables = tf.constant(
+        np.stack([diagonal_table(qaoa.maxcut(g)[0], wires) for g in graphs]), dtype=tf.float64
+    )
+
+    # Batched QAOA circuit, with parameters of shape (batch, 2, n_layers)
+    def circuit(params, **kwargs):
+        params = tf.cast(params, dtype=tf.float64)
+        for w in wires:
+            qml.Hadamard(wires=w)
+        for layer in range(n_layers):
+            gamma = params[:, 0, layer]
+            alpha = params[:, 1, layer]
+            phases = -gamma[:, None] * cost_tables
+            qml.DiagonalQubitUnitary(tf.exp(tf.complex(tf.zeros_like(phases), phases)), wires=wires)
+            for w in wires:
+                qml.RX(2 * alpha, wires=w)
+        return qml.probs(wires=wires)
+
+    dev = qml.device("default.qubit.tf", wires=n_nodes)
+    probs = qml.QNode(circuit, dev, interface="tf", diff_method="backprop")
+
+    def hamiltonian(params, **kwargs):
+        """Evaluate the cost Hamiltonians of all graphs, given one set of angles per graph."""
+        return expectation(probs(params), cost_tables)
+
+    return hamiltonian
+
+
+######################################################################
+# We can check that the batched cost function agrees with the cost functions
+# of the individual graphs, here for random angles:
+#
+
+batched_cost = qaoa_from_graphs(graphs, n_layers=n_layers)
+
+test_params = tf.random.uniform(shape=(len(graphs), 2, n_layers))
+single_costs = [graph_cost(p) for graph_cost, p in zip(graph_cost_list, test_params)]
+print(f"Maximal deviation: {np.max(np.abs(batched_cost(test_params) - single_costs)):.2e}")
+
+##############################################################################
+# .. rst-class:: sphx-glr-script-out
+#
+#  Out:
+#
+#  .. code-block:: none
+#
+#      Maximal deviation: 1.78e-14
+#
+
+######################################################################
+# The batched versions of ``rnn_iteration`` and ``recurrent_loop`` have
+# the same structure as before, but all tensors carry a leading batch
+# dimension. We train a fresh LSTM cell, so that we can compare it with the
+# one trained graph by graph.
+#
+
+batched_cell = tf.keras.layers.LSTMCell(2 * n_layers)
+
+
+def batched_rnn_iteration(inputs, batched_cost, n_layers=1):
+    """Perform a single time step of the custom RNN for a whole batch of graphs."""
+
+    prev_cost, prev_params, prev_h, prev_c = inputs
+
+    # Inputs of shape (batch, 1 + 2 * n_layers) and states of shape (batch, 2 * n_layers)
+    new_input = tf.keras.layers.concatenate([prev_cost, prev_params])
+    new_params, [new_h, new_c] = batched_cell(new_input, states=[prev_h, prev_c])
+
+    # One set of QAOA angles per graph, evaluated in a single circuit execution
+    _params = tf.reshape(new_params, shape=(-1, 2, n_layers))
+    _cost = batched_cost(_params)
+
+    new_cost = tf.reshape(tf.cast(_cost, dtype=tf.float32), shape=(-1, 1))
+
+    return [new_cost, new_params, new_h, new_c]
+
+
+def batched_recurrent_loop(batched_cost, batch_size, n_layers=1):
+    """Creates the recurrent loop for a batch of graphs and returns the mean loss."""
+
+    initial_cost = tf.zeros(shape=(batch_size, 1))
+    initial_params = tf.zeros(shape=(batch_size, 2 * n_layers))
+    initial_h = tf.zeros(shape=(batch_size, 2 * n_layers))
+    initial_c = tf.zeros(shape=(batch_size, 2 * n_layers))
+
+    out = [initial_cost, initial_params, initial_h, initial_c]
+    costs = []
+    for _ in range(5):
+        out = batched_rnn_iteration(out, batched_cost, n_layers)
+        costs.append(out[0])
+
+    # Same weighted loss as before, for every graph, averaged over the batch
+    loss = tf.keras.layers.average([w * c for w, c in zip([0.1, 0.2, 0.3, 0.4, 0.5], costs)])
+    return tf.reduce_mean(loss)
+
+
+def batched_train_step(batched_cost, batch_size):
+    """Single optimization step on a whole batch of graphs."""
+
+    with tf.GradientTape() as tape:
+        loss = batched_recurrent_loop(batched_cost, batch_size, n_layers)
+
+    grads = tape.gradient(loss, batched_cell.trainable_weights)
+    batched_opt.apply_gradients(zip(grads, batched_cell.trainable_weights))
+    return loss
+
+
+######################################################################
+# Every epoch now corresponds to a single gradient step on the average loss
+# of all graphs, which requires only five batched circuit executions. As
+# each step is so cheap, we can afford more epochs than before.
+#
+
+batched_opt = tf.keras.optimizers.Adam(learning_rate=0.1)
+
+batched_epochs = 50
+
+for epoch in range(batched_epochs):
+    loss = batched_train_step(batched_cost, len(graphs))
+    if epoch % 10 == 0 or epoch == batched_epochs - 1:
+        print(f"Epoch {epoch+1} - Mean loss: {loss.numpy()}")
+
+##############################################################################
+# .. rst-class:: sphx-glr-script-out
+#
+#  Out:
+#
+#  .. code-block:: none
+#
+#      Epoch 1 - Mean loss: -1.4458611011505127
+#      Epoch 11 - Mean loss: -1.77101731300354
+#      Epoch 21 - Mean loss: -1.8283531665802002
+#      Epoch 31 - Mean loss: -1.83175528049469
+#      Epoch 41 - Mean loss: -1.8345181941986084
+#      Epoch 50 - Mean loss: -1.8377357721328735
+#
+
+######################################################################
+# The mean loss over the dataset reaches a value comparable to the one of
+# the LSTM trained graph by graph. Let us compare the two cells on the
+# training graphs, and measure how long it takes to evaluate each loss:
+#
+
+import time
+
+start = time.perf_counter()
+sequential_loss = np.mean([recurrent_loop(c).numpy() for c in graph_cost_list])
+sequential_time = time.perf_counter() - start
+
+start = time.perf_counter()
+batched_loss = batched_recurrent_loop(batched_cost, len(graphs)).numpy()
+batched_time = time.perf_counter() - start
+
+print(f"Graph by graph: {sequential_loss} ({sequential_time:.2f} s)")
+print(f"Batched:        {batched_loss} ({batched_time:.2f} s)")
+
+##############################################################################
+# .. rst-class:: sphx-glr-script-out
+#
+#  Out:
+#
+#  .. code-block:: none
+#
+#      Graph by graph: -1.8384109735488892 (12.83 s)
+#      Batched:        -1.8376379013061523 (0.57 s)
+#
+
+######################################################################
+# Both cells reach almost the same loss. Evaluating the loss on the 20 training
+# graphs takes :math:`20 \times 5 = 100` circuit executions graph by graph, but only
+# five batched executions. Each batched execution still simulates 20 circuits, one
+# per graph, so the number of simulated circuits is the same. However, the simulator
+# evaluates them at once, and the batched evaluation is more than 20 times faster
+# (the timings above depend on the hardware). During its training, the batched
+# cell simulated :math:`50 \times 5 \times 20 = 5000` circuits in its
+# 250 batched executions, ten times as many as the 500 circuits of the five
+# sequential epochs.
+#
+
+
 ######################################################################
 # Results
 # --------------------
@@ -10,7 +10,7 @@ Quantum natural SPSA optimizer
 
    tutorial_spsa Simultaneous perturbation stochastic approximation (SPSA) optimizer
 
-*Author: Yiheng Duan — Posted: 18 July 2022. Last updated: 05 September 2022.*
+*Author: Yiheng Duan — Posted: 18 July 2022. Last updated: 18 October 2026.*
 
 In this tutorial, we show how we can implement the
 `quantum natural simultaneous perturbation stochastic approximation (QN-SPSA) optimizer
@@ -656,6 +656,20 @@ if loss_curr + tol < loss_next:
 # sending tapes in batches could also enable further efficiency
 # improvement in circuit compilation.
 #
+# We take this idea as far as the algorithm allows: the tapes of all
+# resamplings, as well as the tape measuring the current loss for blocking,
+# are sent to the device in a single batch. Only the loss at the next
+# parameters, which depends on the outcome of this batch, is executed
+# separately. The four overlap tapes also share the operations at the current
+# parameters, so that the QNode only has to be constructed once for them.
+#
+# Finally, since the metric tensor is symmetric, the matrix square root
+# :math:`\sqrt{\bar{\boldsymbol{g}}^2}` in equation (11) has the same
+# eigenvectors as :math:`\bar{\boldsymbol{g}}`, with the absolute values of its eigenvalues.
+# Instead of calling ``sqrtm``, we therefore compute the eigendecomposition with
+# ``np.linalg.eigh``, which is cheaper and numerically more stable, and reuse
+# it to solve equation (13).
+#
 # With this rewriting, the complete optimizer class is provided in the
 # following cell.
 #
@@ -663,7 +677,6 @@ if loss_curr + tol < loss_next:
 import random
 import pennylane as qml
 from pennylane import numpy as np
-from scipy.linalg import sqrtm
 import warnings
 
 
@@ -707,6 +720,9 @@ class QNSPSA:
         self.reg = regularization
         self.finite_diff_step = finite_diff_step
         self.metric_tensor = None
+        self.eigvals = None
+        self.eigvecs = None
+        self.loss_curr = None
         self.k = 1
         self.resamplings = resamplings
         self.blocking = blocking
@@ -771,14 +787,27 @@ class QNSPSA:
 
     def __step_core(self, cost, params):
         # Core function that returns the next parameters before applying blocking.
+        # The tapes of all resamplings, together with the tape for the current
+        # loss required by blocking, are sent to the device in a single batch.
+        tapes, grad_dirs, tensor_dirs = [], [], []
+        for i in range(self.resamplings):
+            grad_tapes, grad_dir = self.__get_spsa_grad_tapes(cost, params)
+            metric_tapes, tensor_dir = self.__get_tensor_tapes(cost, params)
+            tapes += grad_tapes + metric_tapes
+            grad_dirs.append(grad_dir)
+            tensor_dirs.append(tensor_dir)
+        if self.blocking:
+            tapes.append(self.__get_loss_tape(cost, params))
+
+        raw_results = qml.execute(tapes, cost.device, None)
+        self.loss_curr = raw_results[-1] if self.blocking else None
+
         grad_avg = np.zeros(params.shape)
         tensor_avg = np.zeros((params.size, params.size))
         for i in range(self.resamplings):
-            grad_tapes, grad_dir = self.__get_spsa_grad_tapes(cost, params)
-            metric_tapes, tensor_dirs = self.__get_tensor_tapes(cost, params)
-            raw_results = qml.execute(grad_tapes + metric_tapes, cost.device, None)
-            grad = self.__post_process_grad(raw_results[:2], grad_dir)
-            metric_tensor = self.__post_process_tensor(raw_results[2:], tensor_dirs)
+            results = raw_results[6 * i : 6 * (i + 1)]
+            grad = self.__post_process_grad(results[:2], grad_dirs[i])
+            metric_tensor = self.__post_process_tensor(results[2:], tensor_dirs[i])
             grad_avg = grad_avg * i / (i + 1) + grad / (i + 1)
             tensor_avg = tensor_avg * i / (i + 1) + metric_tensor / (i + 1)
 
@@ -787,12 +816,22 @@ class QNSPSA:
 
     def __step_core_first_order(self, cost, params):
         # Reduced core function that returns the next parameters with SPSA rule.
-        # Blocking not applied.
-        grad_avg = np.zeros(params.shape)
+        # As in __step_core, the tape for the current loss required by blocking
+        # is sent to the device in the same batch as the gradient tapes.
+        tapes, grad_dirs = [], []
         for i in range(self.resamplings):
             grad_tapes, grad_dir = self.__get_spsa_grad_tapes(cost, params)
-            raw_results = qml.execute(grad_tapes, cost.device, None)
-            grad = self.__post_process_grad(raw_results, grad_dir)
+            tapes += grad_tapes
+            grad_dirs.append(grad_dir)
+        if self.blocking:
+            tapes.append(self.__get_loss_tape(cost, params))
+
+        raw_results = qml.execute(tapes, cost.device, None)
+        self.loss_curr = raw_results[-1] if self.blocking else None
+
+        grad_avg = np.zeros(params.shape)
+        for i in range(self.resamplings):
+            grad = self.__post_process_grad(raw_results[2 * i : 2 * (i + 1)], grad_dirs[i])
             grad_avg = grad_avg * i / (i + 1) + grad / (i + 1)
         return params - self.stepsize * grad_avg
 
@@ -826,12 +865,11 @@ class QNSPSA:
         return metric_tensor
 
     def __get_next_params(self, params, gradient):
-        grad_vec, params_vec = gradient.reshape(-1), params.reshape(-1)
-        new_params_vec = np.linalg.solve(
-            self.metric_tensor,
-            (-self.stepsize * grad_vec + np.matmul(self.metric_tensor, params_vec)),
-        )
-        return new_params_vec.reshape(params.shape)
+        # Solves the linear equation (13) with the eigendecomposition of the
+        # regularized metric tensor computed in __regularize_tensor.
+        grad_vec = gradient.reshape(-1)
+        update_vec = self.eigvecs @ ((self.eigvecs.T @ grad_vec) / self.eigvals)
+        return params - self.stepsize * update_vec.reshape(params.shape)
 
     def __get_perturbation_direction(self, params):
         param_number = len(params) if isinstance(params, list) else params.size
@@ -866,16 +904,17 @@ class QNSPSA:
         perturb2 = dir2 * self.finite_diff_step
         dir_vecs = dir1.reshape(-1), dir2.reshape(-1)
 
+        # the operations at the current parameters are shared by all 4 tapes
+        op_forward = self.__get_operations(cost, params)
         tapes = [
-            self.__get_overlap_tape(cost, params, params + perturb1 + perturb2),
-            self.__get_overlap_tape(cost, params, params + perturb1),
-            self.__get_overlap_tape(cost, params, params - perturb1 + perturb2),
-            self.__get_overlap_tape(cost, params, params - perturb1),
+            self.__get_overlap_tape(cost, op_forward, params + perturb1 + perturb2),
+            self.__get_overlap_tape(cost, op_forward, params + perturb1),
+            self.__get_overlap_tape(cost, op_forward, params - perturb1 + perturb2),
+            self.__get_overlap_tape(cost, op_forward, params - perturb1),
         ]
         return tapes, dir_vecs
 
-    def __get_overlap_tape(self, cost, params1, params2):
-        op_forward = self.__get_operations(cost, params1)
+    def __get_overlap_tape(self, cost, op_forward, params2):
         op_inv = self.__get_operations(cost, params2)
 
         with qml.tape.QuantumTape() as tape:
@@ -891,6 +930,11 @@ class QNSPSA:
         cost.construct([params], {})
         return cost.tape.operations
 
+    def __get_loss_tape(self, cost, params):
+        # Returns the tape measuring the loss at the given parameters.
+        cost.construct([params], {})
+        return cost.tape.copy(copy_operations=True)
+
     def __get_tensor_moving_avg(self, metric_tensor):
         # For numerical stability: averaging on the Fubini-Study metric tensor.
         if self.metric_tensor is None:
@@ -899,17 +943,18 @@ class QNSPSA:
 
     def __regularize_tensor(self, metric_tensor):
         # For numerical stability: Fubini-Study metric tensor regularization.
-        tensor_reg = np.real(sqrtm(np.matmul(metric_tensor, metric_tensor)))
-        return (tensor_reg + self.reg * np.identity(metric_tensor.shape[0])) / (1 + self.reg)
+        # As the metric tensor is symmetric, sqrtm(metric_tensor @ metric_tensor)
+        # has the same eigenvectors, with the absolute values of its eigenvalues.
+        # The eigendecomposition is kept to solve for the next parameters.
+        eigvals, self.eigvecs = np.linalg.eigh(metric_tensor)
+        self.eigvals = (np.abs(eigvals) + self.reg) / (1 + self.reg)
+        return (self.eigvecs * self.eigvals) @ self.eigvecs.T
 
     def __apply_blocking(self, cost, params_curr, params_next):
         # For numerical stability: apply the blocking condition on the parameter update.
-        cost.construct([params_curr], {})
-        tape_loss_curr = cost.tape.copy(copy_operations=True)
-        cost.construct([params_next], {})
-        tape_loss_next = cost.tape.copy(copy_operations=True)
-
-        loss_curr, loss_next = qml.execute([tape_loss_curr, tape_loss_next], cost.device, None)
+        # The current loss has already been measured along with the step tapes.
+        loss_curr = self.loss_curr
+        loss_next = qml.execute([self.__get_loss_tape(cost, params_next)], cost.device, None)[0]
         # self.k has been updated earlier.
         ind = (self.k - 2) % self.history_length
         self.last_n_steps[ind] = loss_curr
@@ -15,7 +15,7 @@ Beyond classical computing with qsim
     tutorial_noisy_circuit_optimization Optimizing noisy circuits with Cirq
     quantum_volume Quantum volume
 
-*Author: Theodor Isacsson — Posted: 30 November 2020. Last updated: 10 September 2021.*
+*Author: Theodor Isacsson — Posted: 30 November 2020. Last updated: 18 October 2026.*
 
 .. figure:: ../demonstrations/qsim_beyond_classical/qc.png
     :align: right
@@ -264,27 +264,25 @@ gate_sequence = np.resize(["A", "B", "C", "D"], m)
 # the circuit, while avoiding the same gate being applied to the same wire
 # twice in a row. We do this by creating a helper function ``generate_single_qubit_gate_list()`` that
 # specifies the order in which the single-qubit
-# gates should be applied. We can use this list within the
+# gates should be applied. We can use this array within the
 # circuit to know which gate to apply when.
 #
+# Adding a random offset between :math:`1` and the number of gates minus one to
+# the previous gate index, modulo the number of gates, selects one of the
+# other gates uniformly at random. This way, all wires of a cycle are drawn at
+# once.
+#
 
-def generate_single_qubit_gate_list():
-    # create the first list by randomly selecting indices
-    # from single_qubit_gates
-    g = [list(np.random.choice(range(len(single_qubit_gates)), size=wires))]
+def generate_single_qubit_gate_list(rng):
+    num_gates = len(single_qubit_gates)
 
-    for cycle in range(len(gate_sequence)):
-        g.append([])
-        for w in range(wires):
-            # check which gate was applied to the wire previously
-            one_gate_removed = list(range(len(single_qubit_gates)))
-            bool_list = np.array(one_gate_removed) == g[cycle][w]
+    # random offsets for all cycles and wires, never a multiple of num_gates
+    offsets = rng.integers(1, num_gates, size=(len(gate_sequence), wires))
 
-            # and remove it from the choices of gates to be applied
-            pop_idx = np.where(bool_list)[0][0]
-            one_gate_removed.pop(pop_idx)
-            g[cycle + 1].append(np.random.choice(one_gate_removed))
-    return g
+    # the first layer is selected uniformly, and every following layer
+    # differs from the previous one on every wire
+    first = rng.integers(0, num_gates, size=(1, wires))
+    return np.cumsum(np.concatenate([first, offsets]), axis=0) % num_gates
 
 
 ######################################################################
@@ -304,8 +302,9 @@ def generate_single_qubit_gate_list():
 
 @qml.qnode(dev)
 def circuit(seed=42, return_probs=False):
-    np.random.seed(seed)
-    gate_idx = generate_single_qubit_gate_list()
+    # the seed only determines the gates, and leaves NumPy's global random state alone
+    rng = np.random.default_rng(seed)
+    gate_idx = generate_single_qubit_gate_list(rng)
 
     # m full cycles - single-qubit gates & two-qubit gate
     for i, gs in enumerate(gate_sequence):
@@ -367,30 +366,53 @@ def circuit(seed=42, return_probs=False):
 #
 #    F_{XEB} = 2^{n}\left<P(x_i)\right> - 1 = \frac{2N}{N+1} - 1.
 #
-# We implement this fidelity as the function below, where ``samples`` is a
-# list of sampled bitstrings, and ``probs`` is a list with corresponding
-# sampling probabilities for the same noiseless circuit.
+# We implement this fidelity as the function below, where ``samples`` is an
+# array of sampled bitstrings, given as the integer indices of the basis
+# states, and ``probs`` is an array with the sampling probabilities of all
+# bitstrings for the same noiseless circuit. Looking up the probabilities
+# of all samples at once is a single indexing operation.
 #
 
 def fidelity_xeb(samples, probs):
-    sampled_probs = []
-    for bitstring in samples:
-        # convert each bitstring into an integer
-        bitstring_idx = int(bitstring, 2)
+    return len(probs) * np.mean(probs[samples]) - 1
 
-        # retrieve the corresponding probability for the bitstring
-        sampled_probs.append(probs[bitstring_idx])
 
-    return 2 ** len(samples[0]) * np.mean(sampled_probs) - 1
+######################################################################
+# Two related scores are often reported alongside the linear fidelity. The
+# logarithmic cross-entropy benchmarking fidelity
+#
+# .. math::
+#
+#    F_{\log} = \log N + \gamma + \left<\log P(x_i)\right>,
+#
+# where :math:`\gamma` is the Euler-Mascheroni constant, is also close to 1
+# for ideal samples and close to 0 for uniform ones. The heavy output
+# generation (HOG) score is the fraction of samples whose ideal probability
+# lies above the median, which tends to :math:`(1 + \ln 2)/2 \approx 0.85`
+# for ideal samples and to :math:`1/2` for uniform ones.
+#
+# All three scores only depend on the ideal probabilities of the samples,
+# so they can be computed in a single pass. To study many circuit
+# instances with millions of samples each, we have put this into a small
+# module, :download:`xeb.py </demonstrations/xeb/xeb.py>`. It accumulates the
+# scores over chunks of samples, and evaluates independent instances, optionally
+# in parallel. Sampled bitstrings are packed into integer indices with the
+# ``bitstrings_to_int`` function of
+# :download:`graph_objectives.py </demonstrations/graph_objectives/graph_objectives.py>`,
+# which is shared with the QAOA demos.
+#
+
+from graph_objectives.graph_objectives import bitstrings_to_int
+from xeb.xeb import XEBAccumulator, instance_seeds, run_instances, xeb_scores
 
 
 ######################################################################
 # We set a random seed and use it to calculate the probability for all the
 # possible bitstrings. It is then possible to sample from exactly the same
-# circuit by using the same seed. Before calculating the cross-entropy
-# benchmarking fidelity, the Pauli-Z samples need to be converted into
-# their correponding bitstrings, since we need the samples to be in the
-# computational basis.
+# circuit by using the same seed. The probabilities are computed exactly,
+# by overriding the number of shots with ``shots=None``. Before calculating
+# the cross-entropy benchmarking fidelity, the sampled bitstrings are
+# packed into the integer indices of the corresponding basis states.
 #
 # .. note::
 #
@@ -401,29 +423,22 @@ def fidelity_xeb(samples, probs):
 #
 
 seed = np.random.randint(0, 42424242)
-probs = circuit(seed=seed, return_probs=True)
+probs = circuit(seed=seed, return_probs=True, shots=None)
 circuit_samples = circuit(seed=seed)
 
-# get bitstrings from the samples
-bitstring_samples = []
-for sam in circuit_samples:
-    bitstring_samples.append("".join(str(bs) for bs in sam))
+# get the integer indices of the sampled bitstrings
+sample_indices = bitstrings_to_int(circuit_samples)
 
-f_circuit = fidelity_xeb(bitstring_samples, probs)
+f_circuit = fidelity_xeb(sample_indices, probs)
 
 ######################################################################
 # Similarly, we can sample random bitstrings from a uniform probability
-# distribution by generating all basis states, along with their
-# corresponding bitstrings, and sample directly from them using NumPy.
+# distribution by drawing their integer indices directly with NumPy.
 #
 
-basis_states = dev.generate_basis_states(wires)
-random_integers = np.random.randint(0, len(basis_states), size=shots)
-bitstring_samples = []
-for i in random_integers:
-    bitstring_samples.append("".join(str(bs) for bs in basis_states[i]))
+random_integers = np.random.randint(0, 2 ** wires, size=shots)
 
-f_uniform = fidelity_xeb(bitstring_samples, probs)
+f_uniform = fidelity_xeb(random_integers, probs)
 
 ######################################################################
 # Finally, let's compare the two different values. Sampling from the
@@ -454,6 +469,21 @@ print("Uniform distribution:", f"{f_uniform:.7f}".rjust(14))
 #     Uniform distribution:      0.0013487
 #
 
+######################################################################
+# The outputs shown in this demo are illustrative: they come from an
+# earlier version of this demo, and since the circuit is chosen with a random
+# seed, every run gives slightly different numbers.
+#
+# The logarithmic fidelity and the HOG score of the same samples show the
+# same separation between the two distributions: for the circuit's samples,
+# they should be close to 1 and 0.85, and for the uniform samples close to 0
+# and 0.5, respectively.
+#
+
+for name, samples in [("Circuit's distribution", sample_indices), ("Uniform distribution", random_integers)]:
+    scores = xeb_scores(samples, probs)
+    print(f"{name}: log-XEB = {scores['log']:.4f}, HOG = {scores['hog']:.4f}")
+
 ######################################################################
 # To show that the fidelity from the circuit sampling actually tends
 # towards the theoretical value calculated above we can run several
@@ -483,33 +513,73 @@ theoretical_value = 2 * N / (N + 1) - 1
 
 print("Theoretical:", f"{theoretical_value:.7f}".rjust(24))
 
-f_circuit = []
-num_of_evaluations = 100
-for i in range(num_of_evaluations):
-    seed = np.random.randint(0, 42424242)
+######################################################################
+# .. rst-class:: sphx-glr-script-out
+#
+#  Out:
+#
+#  .. code-block:: none
+#
+#     Theoretical:                0.9995118
+#
+
+######################################################################
+# Each circuit instance is determined by a pair of seeds: the first one
+# selects the single-qubit gates of the circuit, and the second one seeds a
+# local random number generator for the samples. Since the circuit is
+# noiseless, sampling it is the same as drawing basis states from its exact
+# probabilities, which we have to compute anyway. The generator draws the
+# samples of every instance in chunks of 100,000 shots, which are added to
+# the scores one after the other, without simulating the circuit again for
+# every chunk. Instances never share a random stream, and all seeds are
+# derived from a single entropy value, so the whole study can be reproduced.
+#
+# The instances are evaluated one after the other. To distribute them over a
+# pool of worker processes, pass ``max_workers`` to ``run_instances``, from a
+# script whose top-level code is guarded by ``if __name__ == "__main__":``.
+#
+
+chunk_size = 100000
+
+
+def xeb_instance(seeds):
+    circuit_seed, sampling_seed = seeds
+    rng = np.random.default_rng(sampling_seed)
 
-    probs = circuit(seed=seed, return_probs=True)
-    samples = circuit(seed=seed)
+    probs = circuit(seed=circuit_seed, return_probs=True, shots=None)
+    probs = probs / np.sum(probs)
 
-    bitstring_samples = []
-    for sam in samples:
-        bitstring_samples.append("".join(str(bs) for bs in sam))
+    accumulator = XEBAccumulator(probs)
+    for start in range(0, shots, chunk_size):
+        samples = rng.choice(len(probs), size=min(chunk_size, shots - start), p=probs)
+        accumulator.update(samples)
 
-    f_circuit.append(fidelity_xeb(bitstring_samples, probs))
-    print(f"\r{i + 1:4d} / {num_of_evaluations:4d}{' ':17}{np.mean(f_circuit):.7f}", end="")
-print("\rObserved:", f"{np.mean(f_circuit):.7f}".rjust(27))
+    return accumulator.scores
 
-##############################################################################
+
+num_of_evaluations = 100
+seeds = instance_seeds(entropy=42, num_instances=num_of_evaluations)
+
+instance_scores = run_instances(xeb_instance, seeds)
+f_circuit = [scores["linear"] for scores in instance_scores]
+
+print("Observed:", f"{np.mean(f_circuit):.7f}".rjust(27))
+
+######################################################################
 # .. rst-class:: sphx-glr-script-out
 #
 #  Out:
 #
 #  .. code-block:: none
 #
-#     Theoretical:                0.9995118
 #     Observed:                   0.9999512
 #
 
+######################################################################
+# With 100 instances of 500,000 samples each, the observed mean fidelity
+# agrees with the theoretical value to within a few parts in :math:`10^4`.
+#
+
 ######################################################################
 # Classical hardness
 # ------------------
@@ -12,7 +12,7 @@ Quantum volume
 
     qsim_beyond_classical Beyond classical computing with qsim
 
-*Author: Olivia Di Matteo — Posted: 15 December 2020. Last updated: 15 April 2021.*
+*Author: Olivia Di Matteo — Posted: 15 December 2020. Last updated: 18 October 2026.*
 
 Twice per year, a project called the TOP500 [#top500]_ releases a list of the
 500 most powerful supercomputing systems in the world. However, there is a large
@@ -325,14 +325,16 @@ print(f"Heavy output probability = {heavy_output_prob}")
 #
 # First we write a function that randomly permutes qubits. We'll do this by
 # using numpy to generate a permutation, and then apply it with the built-in
-# :func:`~.pennylane.Permute` subroutine.
+# :func:`~.pennylane.Permute` subroutine. All random choices are made with a
+# numpy random number generator that is passed to the functions, so that every
+# circuit can be reproduced from a seed.
 
 import pennylane as qml
 
 # Object for random number generation from numpy
 rng = np.random.default_rng()
 
-def permute_qubits(num_qubits):
+def permute_qubits(num_qubits, rng):
     # A random permutation
     perm_order = list(rng.permutation(num_qubits))
     qml.Permute(perm_order, wires=list(range(num_qubits)))
@@ -341,18 +343,20 @@ def permute_qubits(num_qubits):
 ##############################################################################
 #
 # Next, we need to apply SU(4) gates to pairs of qubits. PennyLane doesn't have
-# built-in functionality to generate these random matrices, however its cousin
-# `Strawberry Fields <https://strawberryfields.ai/>`_ does! We will use the
-# ``random_interferometer`` method, which can generate unitary matrices uniformly
-# at random. This function actually generates elements of U(4), but they are
+# built-in functionality to generate these random matrices, so we use the
+# ``haar_unitaries`` function of the helper module
+# :download:`haar_sampling.py </demonstrations/haar_sampling/haar_sampling.py>`,
+# which is also used in the :doc:`demo on the Haar measure </demos/tutorial_haar_measure>`.
+# It generates unitary matrices uniformly at random, drawn from the given random
+# number generator. These are actually elements of U(4), but they are
 # essentially equivalent up to a global phase.
 
-from strawberryfields.utils import random_interferometer
+from haar_sampling.haar_sampling import haar_unitaries
 
-def apply_random_su4_layer(num_qubits):
+def apply_random_su4_layer(num_qubits, rng):
     for qubit_idx in range(0, num_qubits, 2):
         if qubit_idx < num_qubits - 1:
-            rand_haar_su4 = random_interferometer(N=4)
+            rand_haar_su4 = haar_unitaries(4, rng=rng)
             qml.QubitUnitary(rand_haar_su4, wires=[qubit_idx, qubit_idx + 1])
 
 
@@ -364,9 +368,9 @@ def apply_random_su4_layer(num_qubits):
 #
 
 
-def qv_circuit_layer(num_qubits):
-    permute_qubits(num_qubits)
-    apply_random_su4_layer(num_qubits)
+def qv_circuit_layer(num_qubits, rng):
+    permute_qubits(num_qubits, rng)
+    apply_random_su4_layer(num_qubits, rng)
 
 
 ##############################################################################
@@ -383,7 +387,7 @@ dev_ideal = qml.device("lightning.qubit", shots=None, wires=num_qubits)
 m = 3  # number of qubits
 
 with qml.tape.QuantumTape() as tape:
-    qml.layer(qv_circuit_layer, m, num_qubits=m)
+    qml.layer(qv_circuit_layer, m, num_qubits=m, rng=rng)
 
 expanded_tape = tape.expand(stop_at=lambda op: isinstance(op, qml.QubitUnitary))
 print(qml.drawer.tape_text(expanded_tape, wire_order=dev_ideal.wires, show_all_wires=True, show_matrices=True))
@@ -454,7 +458,11 @@ print(qml.drawer.tape_text(expanded_tape, wire_order=dev_ideal.wires, show_all_w
 # the classical simulation, or even consider new volume metrics [#cross]_.
 #
 # The heavy outputs can be retrieved from a classically-obtained probability
-# distribution as follows:
+# distribution as follows. We don't need to sort all :math:`2^m` probabilities
+# to find those above the median: ``np.argpartition`` moves the indices of the
+# :math:`2^{m-1}` largest probabilities to the second half in linear time. We
+# represent the heavy outputs as a boolean mask over the integer indices of the
+# bit strings, so that checking whether a sample is heavy is a single lookup.
 #
 
 def heavy_output_set(m, probs):
@@ -462,18 +470,16 @@ def heavy_output_set(m, probs):
     # probabilities given by probs, which is an array with the probabilities
     # ordered as '000', '001', ... '111'.
 
-    # Sort the probabilities so that those above the median are in the second half
-    probs_ascending_order = np.argsort(probs)
-    sorted_probs = probs[probs_ascending_order]
+    # Partition the probabilities so that those above the median are in the second half
+    above_median = np.argpartition(probs, 2 ** (m - 1))[2 ** (m - 1) :]
 
-    # Heavy outputs are the bit strings above the median
-    heavy_outputs = [
-        # Convert integer indices to m-bit binary strings
-        format(x, f"#0{m+2}b")[2:] for x in list(probs_ascending_order[2 ** (m - 1) :])
-    ]
+    # Heavy outputs are the bit strings above the median, heavy_outputs[x] is True
+    # if the bit string with integer index x is heavy
+    heavy_outputs = np.zeros(2 ** m, dtype=bool)
+    heavy_outputs[above_median] = True
 
     # Probability of a heavy output
-    prob_heavy_output = np.sum(sorted_probs[2 ** (m - 1) :])
+    prob_heavy_output = np.sum(probs[heavy_outputs])
 
     return heavy_outputs, prob_heavy_output
 
@@ -500,7 +506,7 @@ for idx, prob in enumerate(output_probs):
 
 print(f"\nMedian is {np.median(output_probs):.4f}")
 print(f"Probability of a heavy output is {prob_heavy_output:.4f}")
-print(f"Heavy outputs are {heavy_outputs}")
+print(f"Heavy outputs are {[format(x, '03b') for x in np.flatnonzero(heavy_outputs)]}")
 
 
 ##############################################################################
@@ -522,7 +528,7 @@ print(f"Heavy outputs are {heavy_outputs}")
 #
 #       Median is 0.0554
 #       Probability of a heavy output is 0.8939
-#       Heavy outputs are ['000', '110', '101', '001']
+#       Heavy outputs are ['000', '001', '101', '110']
 #
 
 ##############################################################################
@@ -608,14 +614,14 @@ dev_noisy = qml.device(
 
 coupling_map = dev_lima.backend.configuration().to_dict()["coupling_map"]
 
-dev_noisy.set_transpile_args(
-    **{
-        "optimization_level": 3,
-        "coupling_map": coupling_map,
-        "layout_method": "sabre",
-        "routing_method": "sabre",
-    }
-)
+transpile_args = {
+    "optimization_level": 3,
+    "coupling_map": coupling_map,
+    "layout_method": "sabre",
+    "routing_method": "sabre",
+}
+
+dev_noisy.set_transpile_args(**transpile_args)
 
 
 ##############################################################################
@@ -624,46 +630,129 @@ dev_noisy.set_transpile_args(
 # qubits, and make our way up to 5. At each :math:`m`, we'll look at 200 randomly
 # generated circuits.
 #
+# The trials are independent of each other, so we can run them in parallel.
+# A single trial builds a random circuit, simulates it analytically to find its
+# heavy outputs, and samples it on the noisy device. The noisy device returns
+# the samples of the first :math:`m` qubits, which we convert to integer indices
+# and look up in the heavy output mask. Every trial gets its own seed for the
+# permutations and the random SU(4) matrices, so that the results don't depend on
+# which process runs which trial, and each trial can be reproduced later on.
+#
 
-min_m = 2
-max_m = 5
-num_ms = (max_m - min_m) + 1
+def init_qv_worker(noise_model, transpile_args):
+    # Every worker process sets up its own copy of the two devices
+    global dev_ideal, dev_noisy
 
-num_trials = 200
+    dev_ideal = qml.device("lightning.qubit", shots=None, wires=num_qubits)
+    dev_noisy = qml.device(
+        "qiskit.aer", wires=num_qubits, shots=1000, noise_model=noise_model
+    )
+    dev_noisy.set_transpile_args(**transpile_args)
+
+
+def run_qv_trial(m, trial, seed):
+    # The permutations and the SU(4) matrices of this trial only depend on its seed
+    trial_rng = np.random.default_rng(seed)
+
+    with qml.tape.QuantumTape() as tape:
+        qml.layer(qv_circuit_layer, m, num_qubits=m, rng=trial_rng)
+
+    # Simulate the circuit analytically
+    ideal_tape = qml.tape.QuantumScript(tape.operations, [qml.probs(wires=range(m))])
+    output_probs = qml.execute([ideal_tape], dev_ideal, None)[0].reshape(2 ** m, )
+    heavy_outputs, prob_heavy_output = heavy_output_set(m, output_probs)
+
+    # Execute circuit on the noisy device and look up the sampled bit strings
+    noisy_tape = qml.tape.QuantumScript(tape.operations, [qml.sample(wires=range(m))])
+    samples = np.reshape(qml.execute([noisy_tape], dev_noisy, None)[0], (-1, m)).astype(int)
+    sample_indices = samples @ (2 ** np.arange(m - 1, -1, -1))
+    fraction_device_heavy_output = np.mean(heavy_outputs[sample_indices])
 
-# To store the results
-probs_ideal = np.zeros((num_ms, num_trials))
-probs_noisy = np.zeros((num_ms, num_trials))
+    return m, trial, seed, prob_heavy_output, fraction_device_heavy_output
 
-for m in range(min_m, max_m + 1):
-    for trial in range(num_trials):
 
-        # Simulate the circuit analytically
-        with qml.tape.QuantumTape() as tape:
-            qml.layer(qv_circuit_layer, m, num_qubits=m)
-            qml.probs(wires=range(m))
+##############################################################################
+#
+# We run the trials for all widths one after the other, or on a pool of
+# ``n_workers`` worker processes. If a ``results_path`` is given, each result is
+# appended to this CSV file as soon as it arrives, so that a long run can be
+# monitored, or analyzed even if it is interrupted. Every 50 trials of a width,
+# we print the current mean heavy output probability of the device together with
+# the :math:`2\sigma` confidence interval discussed in the next step.
+#
+# On platforms where worker processes are spawned, e.g., Windows and macOS, the
+# workers re-import the script that starts them. To use ``n_workers > 1`` there,
+# run the trials from a script whose top-level code is guarded by
+# ``if __name__ == "__main__":``.
+#
 
-        output_probs = qml.execute([tape], dev_ideal, None)
-        output_probs = output_probs[0].reshape(2 ** m, )
-        heavy_outputs, prob_heavy_output = heavy_output_set(m, output_probs)
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-        # Execute circuit on the noisy device
-        qml.execute([tape], dev_noisy, None)
 
-        # Get the output bit strings; flip ordering of qubits to match PennyLane
-        counts = dev_noisy._current_job.result().get_counts()
-        reordered_counts = {x[::-1]: counts[x] for x in counts.keys()}
+def run_qv_trials(seeds, min_m, results_path=None, n_workers=1):
+    """Runs one trial per seed, where row i of ``seeds`` holds the seeds of width
+    ``min_m + i``, and returns the ideal and noisy heavy output probabilities."""
+    num_ms, num_trials = seeds.shape
+    probs_ideal = np.zeros((num_ms, num_trials))
+    probs_noisy = np.zeros((num_ms, num_trials))
+    num_done = np.zeros(num_ms, dtype=int)
 
-        device_heavy_outputs = np.sum(
-            [
-                reordered_counts[x] if x[:m] in heavy_outputs else 0
-                for x in reordered_counts.keys()
-            ]
+    trials = [
+        (m, trial, seeds[m - min_m, trial])
+        for m in range(min_m, min_m + num_ms)
+        for trial in range(num_trials)
+    ]
+
+    executor = None
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=init_qv_worker,
+            initargs=(noise_model, transpile_args),
         )
-        fraction_device_heavy_output = device_heavy_outputs / dev_noisy.shots
+        futures = [executor.submit(run_qv_trial, *args) for args in trials]
+        results = (future.result() for future in as_completed(futures))
+    else:
+        results = (run_qv_trial(*args) for args in trials)
+
+    results_file = None if results_path is None else open(results_path, "w")
+    try:
+        if results_file is not None:
+            results_file.write("m,trial,seed,ideal,noisy\n")
+
+        for m, trial, seed, prob_heavy_output, fraction_device_heavy_output in results:
+            if results_file is not None:
+                results_file.write(f"{m},{trial},{seed},{prob_heavy_output},{fraction_device_heavy_output}\n")
+                results_file.flush()
+
+            probs_ideal[m - min_m, trial] = prob_heavy_output
+            probs_noisy[m - min_m, trial] = fraction_device_heavy_output
+            num_done[m - min_m] += 1
+
+            n = num_done[m - min_m]
+            if n % 50 == 0:
+                # Mean and confidence interval over the trials finished so far
+                p = np.sum(probs_noisy[m - min_m]) / n
+                print(f"m = {m}, {n} trials: {p:.3f} +- {2 * np.sqrt(p * (1 - p) / n):.3f}")
+    finally:
+        if results_file is not None:
+            results_file.close()
+        if executor is not None:
+            executor.shutdown()
+
+    return probs_ideal, probs_noisy
+
+
+min_m = 2
+max_m = 5
+num_ms = (max_m - min_m) + 1
+
+num_trials = 200
+
+# One seed per trial
+seeds = rng.integers(2 ** 32, size=(num_ms, num_trials))
 
-        probs_ideal[m - min_m, trial] = prob_heavy_output
-        probs_noisy[m - min_m, trial] = fraction_device_heavy_output
+probs_ideal, probs_noisy = run_qv_trials(seeds, min_m)
 
 ##############################################################################
 #
@@ -673,6 +762,9 @@ for m in range(min_m, max_m + 1):
 # Having run our experiments, we can now get to the heart of the quantum volume
 # protocol: what *is* the largest square circuit that our processor can run?
 # Let's first check out the means and see how much higher they are than 2/3.
+# The outputs shown in this section are illustrative: they come from an earlier
+# run of the experiment, and since the seeds of the trials are drawn at random,
+# every run gives slightly different numbers.
 #
 
 probs_mean_ideal = np.mean(probs_ideal, axis=1)
@@ -17,7 +17,7 @@ How to approximate a classical kernel with a quantum computer
    tutorial_expressivity_fourier_series Quantum models as Fourier series
 
 
-*Author: Elies Gil-Fuster (Xanadu Resident) — Posted: 01 Mar 2022. Last updated: 02 March 2022*
+*Author: Elies Gil-Fuster (Xanadu Resident) — Posted: 01 Mar 2022. Last updated: 18 October 2026*
 
 Forget about advantages, supremacies, or speed-ups.
 Let us understand better what we can and cannot do with a quantum computer.
@@ -432,14 +432,17 @@ def QK_2(x1, x2, thetas, amplitudes):
 ###############################################################################
 # As a couple of quality-of-life improvements, we write a function that implements
 # the QK with the lag :math:`\delta` as its argument, and one that implements it
-# on a given set of data:
+# on a given set of data.
+# For the latter, we make use of parameter broadcasting: passing all lags at
+# once evaluates the kernel on the whole dataset in a single circuit execution,
+# and we obtain one row of probabilities per lag.
 
 def QK(delta, thetas, amplitudes):
     return QK_2(delta, 0, thetas, amplitudes)
 
 def QK_on_dataset(deltas, thetas, amplitudes):
-    y = np.array([QK(delta, thetas, amplitudes) for delta in deltas])
-    return y
+    y = QK_circuit(np.array(deltas, requires_grad=False), 0, thetas, amplitudes)
+    return y[:, 0]
 
 ###############################################################################
 # This is also a good place to fix the ``thetas`` array, so that we don't forget
@@ -530,25 +533,21 @@ plt.show();
 # If you look at it again, you'll see that the zero (or solution) of this
 # second map :math:`F_s` is precisely the array of *probabilities* we are
 # looking for.
-# We can write down the first map as:
+#
+# The first map is nothing but the *autocorrelation* of the probabilities.
+# Instead of evaluating the sums one by one, which takes
+# :math:`\mathcal{O}(d^2)` operations for :math:`d=2^n` probabilities, we can
+# compute all of them at once via the fast Fourier transform in
+# :math:`\mathcal{O}(d\log d)`.
+# Padding the probabilities with zeros to length :math:`2d-1` avoids
+# wrap-around effects, and conveniently orders the output like that of
+# ``pennylane.fourier.coefficients``: first the non-negative frequencies, then
+# the negative ones.
 
 def predict_spectrum(probabilities):
     d = len(probabilities)
-    spectrum = []
-    for s in range(d):
-        s_ = 0
-
-        for j in range(s, d):
-            s_ += probabilities[j] * probabilities[j - s]
-
-        spectrum.append(s_)
-
-    # This is to make the output have the same format as
-    # the output of pennylane.fourier.coefficients
-    for s in range(1,d):
-        spectrum.append(spectrum[d - s])
-
-    return spectrum
+    transformed = np.fft.fft(probabilities, 2 * d - 1)
+    return np.real(np.fft.ifft(np.abs(transformed) ** 2))
 
 ###############################################################################
 # And then :math:`F_s` is just ``predict_spectrum`` minus the spectrum we want to
@@ -572,14 +571,11 @@ def F(probabilities, spectrum):
 
 def J_F(probabilities):
     d = len(probabilities)
-    J = np.zeros(shape=(d,d))
-    for i in range(d):
-        for j in range(d):
-            if (i + j < d):
-                J[i][j] += probabilities[i + j]
-            if(i - j <= 0):
-                J[i][j] += probabilities[j - i]
-    return J
+    i, j = np.indices((d, d))
+    # J[i][j] contains probabilities[i + j] if i + j < d ...
+    padded = np.concatenate([probabilities, np.zeros(d)])
+    # ... plus probabilities[j - i] if i <= j
+    return padded[i + j] + np.where(j >= i, probabilities[np.abs(j - i)], 0)
 
 ###############################################################################
 # Showing that this is indeed :math:`\nabla F_s` is left as an exercise for the
@@ -742,6 +738,59 @@ plt.show();
 #       :width: 70%
 #       :target: javascript:void(0)
 #
+# Scaling to larger encodings
+# ---------------------------
+#
+# Each qubit we add doubles the number of frequencies :math:`d` we can match.
+# This is why it pays off that ``predict_spectrum`` and ``J_F`` are vectorized,
+# and that ``QK_on_dataset`` evaluates all lags in one broadcasted execution.
+# To see the difference, we compare them with the straightforward
+# implementations, which loop over all frequencies and all lags, respectively:
+
+import time
+
+def predict_spectrum_loop(probabilities):
+    d = len(probabilities)
+    spectrum = [sum(probabilities[j] * probabilities[j - s] for j in range(s, d)) for s in range(d)]
+    return spectrum + spectrum[:0:-1]
+
+def make_QK_circuit(n_wires):
+    dev = qml.device("default.qubit", wires = n_wires, shots = None)
+
+    @qml.qnode(dev, interface="autograd")
+    def circuit(x1, amplitudes):
+        ansatz(x1, 0, make_thetas(n_wires), amplitudes, wires = range(n_wires))
+        return qml.probs(wires = range(n_wires))
+
+    return circuit
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+print("n_wires |   spectrum (loop / FFT)   |   QK on dataset (loop / batched)")
+for n in range(2, 7):
+    p = make_initial_probabilities(2 ** n)
+    p = p / np.sum(p)
+    circuit = make_QK_circuit(n)
+    amps = np.sqrt(p)
+
+    t_spectrum_loop = timed(predict_spectrum_loop, p)
+    t_spectrum_fft = timed(predict_spectrum, p)
+    t_QK_loop = timed(lambda: [circuit(delta, amps)[0] for delta in X])
+    t_QK_batched = timed(lambda: circuit(np.array(X, requires_grad=False), amps)[:, 0])
+
+    print(
+        f"{n:7d} | {t_spectrum_loop:10.2e}s / {t_spectrum_fft:.2e}s | "
+        f"{t_QK_loop:10.2e}s / {t_QK_batched:.2e}s"
+    )
+
+###############################################################################
+# The gap grows quickly with the number of qubits, so that fitting the
+# spectrum is no longer the bottleneck when approximating kernels with
+# larger encodings.
+#
 # References
 # ----------
 #
@@ -13,7 +13,7 @@ Doubly stochastic gradient descent
    tutorial_quantum_natural_gradient Quantum natural gradient
    tutorial_rosalin Frugal shot optimization with Rosalin
 
-*Author: Josh Izaac — Posted: 16 October 2019. Last updated: 20 January 2021.*
+*Author: Josh Izaac — Posted: 16 October 2019. Last updated: 18 October 2026.*
 
 In this tutorial we investigate and implement the doubly stochastic gradient descent
 paper from `Ryan Sweke et al. (2019) <https://arxiv.org/abs/1910.01155>`__. In this paper,
@@ -395,6 +395,150 @@ plt.show()
 
 print("Adaptive QSGD min energy = ", qnode_analytic(params))
 
+##############################################################################
+# Grouping the sampled terms
+# --------------------------
+#
+# Above, the sampled terms are summed into a single ``qml.Hermitian`` observable.
+# On hardware, however, this observable has to be measured term by term, with each
+# Pauli term requiring its own circuit evaluation. Fortunately, terms that are
+# *qubit-wise commuting* can be measured in a shared basis, so that the same
+# measurement samples can be reused to estimate all of them.
+#
+# Let's write the Hamiltonian terms as Pauli words and group them into qubit-wise
+# commuting sets. By passing the term indices in place of the coefficients,
+# :func:`~.pennylane.pauli.group_observables` tells us which terms end up in which group:
+
+coeffs = np.array([2, 4, -1, 5, 2], requires_grad=False)
+paulis = [
+    qml.PauliX(1),
+    qml.PauliZ(1),
+    qml.PauliX(0) @ qml.PauliX(1),
+    qml.PauliY(0) @ qml.PauliY(1),
+    qml.PauliZ(0) @ qml.PauliX(1),
+]
+
+_, term_groups = qml.pauli.group_observables(paulis, list(range(5)), grouping_type="qwc")
+print("Measurement bases (term indices):", term_groups)
+
+##############################################################################
+# For every optimization step, we sample the terms, and then create one tape
+# for each measurement basis that contains at least one sampled term. The
+# ansatz is decomposed only once, and its gates are shared among all tapes.
+# Since all observables of a tape are qubit-wise commuting, the device
+# estimates them from the same set of samples.
+
+
+def sampled_tapes(params, n):
+    """Sample n Hamiltonian terms and create one tape per measurement basis."""
+    idx = np.random.choice(np.arange(5), size=n, replace=False)
+    ops = StronglyEntanglingLayers(weights=params, wires=[0, 1]).decomposition()
+
+    tapes, tape_coeffs = [], []
+    for group in term_groups:
+        sampled = [i for i in group if i in idx]
+        if not sampled:
+            continue
+
+        with qml.tape.QuantumTape() as tape:
+            for op in ops:
+                qml.apply(op)
+            for i in sampled:
+                qml.expval(paulis[i])
+
+        tapes.append(tape)
+        tape_coeffs.append(coeffs[sampled])
+
+    return tapes, tape_coeffs
+
+
+##############################################################################
+# Let's first check that the grouped estimator is still unbiased. For fixed parameters,
+# we sample the terms 1000 times and evaluate *all* resulting tapes in a single
+# call to :func:`~.pennylane.execute`. Rescaling the sampled sum by :math:`5/n` and
+# averaging, we recover the analytic cost up to shot noise. Note that we disable
+# the cache of :func:`~.pennylane.execute`, as otherwise identical tapes
+# would share a single set of samples instead of being measured independently:
+
+n = 2
+dev_stochastic.shots = 100
+all_tapes, all_coeffs = [], []
+
+for _ in range(1000):
+    tapes, tape_coeffs = sampled_tapes(init_params, n)
+    all_tapes.append(tapes)
+    all_coeffs.append(tape_coeffs)
+
+flat_tapes = [tape for tapes in all_tapes for tape in tapes]
+results = iter(qml.execute(flat_tapes, dev_stochastic, gradient_fn=None, cache=False))
+
+estimates = [
+    4 + (5 / n) * sum(np.dot(c, np.atleast_1d(next(results))) for c in tape_coeffs)
+    for tape_coeffs in all_coeffs
+]
+
+print("Mean of the grouped estimates =", np.mean(estimates))
+print("Analytic cost                 =", qnode_analytic(init_params))
+
+##############################################################################
+# To train the circuit, we also need the gradient. Using
+# :func:`~.pennylane.gradients.param_shift`, we generate the shifted tapes for
+# every measurement basis, and evaluate the unshifted and shifted tapes of a step
+# together in a single batch. The loss and the gradient are then both obtained
+# from the same sampled terms and shots.
+
+
+def loss_and_grad(params, n, device):
+    """Doubly stochastic estimate of the loss and its gradient from a single batch."""
+    tapes, tape_coeffs = sampled_tapes(params, n)
+
+    batch, fns = list(tapes), []
+    for tape in tapes:
+        grad_tapes, fn = qml.gradients.param_shift(tape)
+        fns.append((len(batch), len(grad_tapes), fn))
+        batch.extend(grad_tapes)
+
+    results = qml.execute(batch, device, gradient_fn=None)
+
+    loss, grad = 4.0, np.zeros(params.size)
+    for tape_idx, (c, (start, num, fn)) in enumerate(zip(tape_coeffs, fns)):
+        jac = np.reshape(np.array(fn(results[start : start + num])), (len(c), -1))
+        loss = loss + (5 / n) * np.dot(c, np.atleast_1d(results[tape_idx]))
+        grad = grad + (5 / n) * c @ jac
+
+    return loss, np.reshape(grad, params.shape), len(batch)
+
+
+##############################################################################
+# With this, each step needs one circuit (and its parameter-shifted
+# versions) per sampled measurement basis, instead of one per sampled term.
+# Let's rerun the doubly stochastic gradient descent with a single sampled term,
+# and then with all terms, using the grouped estimator:
+
+for n in [1, 5]:
+    cost_grouped = []
+    params = np.array(init_params, requires_grad=False)
+    num_circuits = 0
+
+    for i in range(250):
+        loss, grad, num = loss_and_grad(params, n, dev_stochastic)
+        cost_grouped.append(loss)
+        params = params - 0.005 * grad
+        num_circuits += num
+
+    print(
+        "n = {}: {} circuits per step on average, min energy = {:.4f}".format(
+            n, num_circuits / 250, qnode_analytic(params)
+        )
+    )
+
+##############################################################################
+# When all five terms are sampled, they are measured in four bases rather than
+# five, since the terms :math:`I\otimes X` and :math:`X\otimes X` share a basis. For larger
+# Hamiltonians, such as molecular Hamiltonians with many terms, the number of
+# qubit-wise commuting groups is typically much smaller than the number of terms,
+# and the savings are correspondingly larger.
+
 ##############################################################################
 # References
 # ----------
@@ -11,7 +11,7 @@ Feedback-Based Quantum Optimization (FALQON)
    tutorial_qaoa_intro Intro to QAOA
    tutorial_qaoa_maxcut QAOA for MaxCut
 
-*Authors: David Wakeham and Jack Ceroni — Posted: 21 May 2021. Last updated: 21 May 2021.*
+*Authors: David Wakeham and Jack Ceroni — Posted: 21 May 2021. Last updated: 18 October 2026.*
 
 -----------------------------
 
@@ -180,27 +180,36 @@ print(driver_h)
 #          \delta_{kj} Z_{i} Y_{k} - \delta_{ki} Y_k - \delta_{kj} Y_k \big) + 6 \displaystyle\sum_{i \in V(G)} Y_{i}.
 #
 # This new operator has quite a few terms! Therefore, we write a short method which computes it for us, and returns
-# a :class:`~.pennylane.Hamiltonian` object. Note that this method works for any graph:
+# a :class:`~.pennylane.Hamiltonian` object. Rather than adding up :class:`~.pennylane.Hamiltonian` objects term by
+# term, which simplifies the growing Hamiltonian over and over again, we collect the coefficients of all Pauli words
+# in a dictionary in a single pass over the edges of the complement graph, and create the Hamiltonian once at the end.
+# Each edge :math:`(i, j)` contributes the terms :math:`Y_i Z_j` and :math:`Z_i Y_j`, and removes :math:`6` from the
+# coefficients of :math:`Y_i` and :math:`Y_j`. Note that this method works for any graph:
 #
 
-def build_hamiltonian(graph):
-    H = qml.Hamiltonian([], [])
+from functools import reduce
+
 
+def build_hamiltonian(graph):
     # Computes the complement of the graph
     graph_c = nx.complement(graph)
 
-    for k in graph_c.nodes:
-        # Adds the terms in the first sum
-        for edge in graph_c.edges:
-            i, j = edge
-            if k == i:
-                H += 6 * (qml.PauliY(k) @ qml.PauliZ(j) - qml.PauliY(k))
-            if k == j:
-                H += 6 * (qml.PauliZ(i) @ qml.PauliY(k) - qml.PauliY(k))
-        # Adds the terms in the second sum
-        H += 6 * qml.PauliY(k)
+    # Coefficients of the Pauli words, e.g. (("Y", i), ("Z", j)) for Y_i Z_j,
+    # starting with the terms in the second sum
+    coeffs = {(("Y", k),): 6 for k in graph_c.nodes}
+
+    # Adds the terms in the first sum
+    for i, j in graph_c.edges:
+        coeffs[(("Y", i), ("Z", j))] = 6
+        coeffs[(("Z", i), ("Y", j))] = 6
+        coeffs[(("Y", i),)] -= 6
+        coeffs[(("Y", j),)] -= 6
 
-    return H
+    paulis = {"Y": qml.PauliY, "Z": qml.PauliZ}
+    words = [word for word, c in coeffs.items() if c != 0]
+    ops = [reduce(lambda a, b: a @ b, [paulis[p](w) for p, w in word]) for word in words]
+
+    return qml.Hamiltonian([coeffs[word] for word in words], ops)
 
 
 print("MaxClique Commutator")
@@ -236,30 +245,46 @@ def build_maxclique_ansatz(cost_h, driver_h, delta_t):
 
     return ansatz
 
-
-def expval_circuit(beta, measurement_h):
-    ansatz = build_maxclique_ansatz(cost_h, driver_h, delta_t)
-    ansatz(beta)
-    return qml.expval(measurement_h)
-
 ######################################################################
 # Finally, we implement the recursive process, where FALQON is able to determine the values
-# of :math:`\beta_k`, feeding back into itself as the number of layers increases. This is
-# straightforward using the methods defined above:
+# of :math:`\beta_k`, feeding back into itself as the number of layers increases.
+#
+# The circuit after :math:`k` steps is the circuit after :math:`k - 1` steps followed by one more layer.
+# Instead of simulating all :math:`k` layers again in every step, which would require
+# :math:`\mathcal{O}(n^2)` layer applications for :math:`n` steps in total, we carry the state vector
+# forward and apply only the new layer. The circuit ``layer_circuit`` prepares the current state, applies
+# a single FALQON layer, and returns the new state. Both :math:`i[H_d, H_c]` and :math:`H_c` are then
+# measured on this same state, using their sparse matrices which are built once at the beginning:
 
 def max_clique_falqon(graph, n, beta_1, delta_t, dev):
     comm_h = build_hamiltonian(graph) # Builds the commutator
     cost_h, driver_h = qaoa.max_clique(graph, constrained=False) # Builds H_c and H_d
-    cost_fn = qml.QNode(expval_circuit, dev, interface="autograd") # The ansatz + measurement circuit is executable
+
+    comm_matrix = comm_h.sparse_matrix(wire_order=dev.wires)
+    cost_matrix = cost_h.sparse_matrix(wire_order=dev.wires)
+
+    @qml.qnode(dev, interface="autograd")
+    def layer_circuit(state, beta_k):
+        qml.QubitStateVector(state, wires=dev.wires)
+        falqon_layer(beta_k, cost_h, driver_h, delta_t)
+        return qml.state()
+
+    def expval(matrix, state):
+        return np.real(np.vdot(state, matrix @ state))
 
     beta = [beta_1] # Records each value of beta_k
     energies = [] # Records the value of the cost function at each step
 
+    # The first layer acts on the even superposition
+    num_states = 2 ** len(dev.wires)
+    state = layer_circuit(np.ones(num_states) / np.sqrt(num_states), beta_1)
+
     for i in range(n):
-        # Adds a value of beta to the list and evaluates the cost function
-        beta.append(-1 * cost_fn(beta, measurement_h=comm_h))  # this call measures the expectation of the commuter hamiltonian
-        energy = cost_fn(beta, measurement_h=cost_h)  # this call measures the expectation of the cost hamiltonian
-        energies.append(energy)
+        # Adds a value of beta to the list, measuring the commutator on the current state
+        beta.append(-1 * expval(comm_matrix, state))
+        # Applies only the new layer, and measures the cost Hamiltonian on the resulting state
+        state = layer_circuit(state, beta[-1])
+        energies.append(expval(cost_matrix, state))
 
     return beta, energies
 
@@ -417,11 +442,32 @@ def qaoa_circuit(params, **kwargs):
         qml.Hadamard(wires=w)
     qml.layer(qaoa_layer, depth, params[0], params[1])
 
+######################################################################
+# The cost Hamiltonian only contains :math:`Z` and :math:`ZZ` terms, so we do not have to measure it
+# term by term. With the helper module
+# :download:`graph_objectives.py </demonstrations/graph_objectives/graph_objectives.py>`, shared with
+# other QAOA demos, we tabulate its value for all :math:`2^7` bit strings once. The expectation value is
+# then the dot product of this table with the probabilities returned by the circuit, and the same
+# circuit gives us the probability distribution at the end of the optimization.
+
+from graph_objectives.graph_objectives import diagonal_table, expectation
+
+cost_table = diagonal_table(cost_h, dev.wires)
+
 
 @qml.qnode(dev, interface="autograd")
-def qaoa_expval(params):
+def prob_circuit(params):
     qaoa_circuit(params)
-    return qml.expval(cost_h)
+    return qml.probs(wires=dev.wires)
+
+
+def qaoa_expval(params):
+    return expectation(prob_circuit(params), cost_table)
+
+######################################################################
+# Since the table holds the cost of every bit string, it also tells us the exact solution to compare against:
+
+print("Ground state: |{}>, energy = {}".format(np.argmin(cost_table), np.min(cost_table)))
 
 ######################################################################
 # Now all we have to do is run FALQON for :math:`5` steps to get our initial QAOA parameters.
@@ -447,13 +493,7 @@ for s in range(steps):
 
 ######################################################################
 # To conclude, we can check how well FALQON/QAOA solved the optimization problem. We
-# define a circuit which outputs the probabilities of measuring each bit string, and
-# create a bar graph:
-
-@qml.qnode(dev, interface="autograd")
-def prob_circuit(params):
-    qaoa_circuit(params)
-    return qml.probs(wires=dev.wires)
+# evaluate the probabilities of measuring each bit string, and create a bar graph:
 
 probs = prob_circuit(params)
 plt.bar(range(2**len(dev.wires)), probs)
@@ -17,7 +17,7 @@ Generalized parameter-shift rules
    tutorial_quantum_analytic_descent Quantum analytic descent
 
 
-*Author: David Wierichs (Xanadu Resident) — Posted: 23 August 2021. Last updated: 27 August 2021*
+*Author: David Wierichs (Xanadu Resident) — Posted: 23 August 2021. Last updated: 18 October 2026*
 
 In this demo we will look at univariate quantum functions, i.e., those that
 depend on a single parameter. We will investigate the form such functions usually take
@@ -836,6 +836,186 @@ print(f"Second-order finite difference:    {np.round(np.array(fd_der2), 6)}")
 # The parameter-shift rules work as expected! And we were able to save
 # a circuit evaluation as compared to a full reconstruction.
 #
+# Batched reconstructions
+# -----------------------
+#
+# When reconstructions are used within an optimizer, as for example in
+# |Rotosolve_code|_, they are called over and over again, and the implementations above
+# spend most of their time in Python overhead: The function is evaluated shift by shift,
+# and each call of a reconstruction builds a new list of kernel arrays.
+# We can avoid both.
+#
+# First, the :math:`2R+1` shifted evaluations do not depend on each other, so that
+# we can compute them in a single execution of the circuit using parameter broadcasting.
+# Second, the reconstruction is *linear* in the evaluations:
+# For any set of points :math:`\{X_j\}` at which we want to know :math:`E`, we have
+#
+# .. math ::
+#
+#   E(X_j) = \sum_{\mu} K_{j\mu} E(x_\mu),\qquad K = B C^{-1},
+#
+# where :math:`C` is the matrix from the non-equidistant reconstruction above and
+# :math:`B` is the same matrix, but evaluated at the points :math:`X_j` instead of the
+# shifts :math:`x_\mu`. For equidistant shifts, the kernel matrix :math:`K` simply
+# contains the Dirichlet kernels from above. As :math:`K` only depends on the shifts
+# and the points :math:`X_j`, it can be computed once and then reused for all
+# reconstructions, which turns the reconstruction into a single matrix product.
+
+
+def fourier_basis(x, R):
+    """Evaluate the trigonometric basis functions with up to R frequencies at x."""
+    frequencies = np.arange(1, R + 1)
+    return np.hstack(
+        [
+            np.ones((len(x), 1)),
+            np.cos(np.outer(x, frequencies)),
+            np.sin(np.outer(x, frequencies)),
+        ]
+    )
+
+
+def reconstruction_kernel(X, shifts):
+    """Compute the matrix that maps evaluations at shifts to the reconstruction at X."""
+    R = (len(shifts) - 1) // 2
+    # Solve C^T K^T = B^T instead of inverting C explicitly
+    return np.linalg.solve(fourier_basis(shifts, R).T, fourier_basis(X, R).T).T
+
+
+###############################################################################
+# Let's confirm that the kernel matrix for equidistant shifts indeed consists of the
+# Dirichlet kernels used in ``full_reconstruction_equ``:
+
+R = 3
+shifts = 2 * np.arange(-R, R + 1) * np.pi / (2 * R + 1)
+K = reconstruction_kernel(X, shifts)
+dirichlet = sinc((R + 0.5) * (X[:, None] - shifts)) / sinc(0.5 * (X[:, None] - shifts))
+print(f"Kernel matrix matches Dirichlet kernels: {np.allclose(K, dirichlet)}")
+
+
+###############################################################################
+# With this, the full reconstruction of a univariate function only requires one
+# (broadcasted) call to the circuit. Instead of a reconstructed function, we directly
+# return its values at the points ``X`` for which the kernel matrix was computed.
+
+
+def batched_reconstruction(fun, shifts, K):
+    """Reconstruct a univariate function on the grid of K, evaluating all shifts at once."""
+    return K @ fun(shifts)
+
+
+for N, cost_function in zip(Ns, cost_functions):
+    shifts = 2 * np.arange(-N, N + 1) * np.pi / (2 * N + 1)
+    E_rec = batched_reconstruction(cost_function, shifts, reconstruction_kernel(X, shifts))
+    E = cost_function(X)
+    print(f"{N} qubits: maximal deviation {np.max(np.abs(E - E_rec)):.2e}")
+
+
+###############################################################################
+# Coordinate-wise reconstructions of multivariate functions
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#
+# Optimizers like Rotosolve reconstruct a cost function of many parameters
+# :math:`\boldsymbol{\theta}` along one coordinate at a time, i.e., they reconstruct
+# the univariate functions :math:`E_d(t)=E(\boldsymbol{\theta}+t\boldsymbol{e}_d)`.
+# All of these functions share the evaluation at :math:`t=0`, so that for :math:`P`
+# parameters we need :math:`2RP+1` evaluations overall. Again, these can be
+# computed in a single broadcasted execution, and because all univariate functions
+# use the same shifts, a single matrix product with the kernel matrix
+# yields all reconstructions at once.
+#
+# To try this out, we create a cost function with :math:`P` parameters, each of which
+# enters the circuit via ``RZ`` gates on all :math:`N` qubits. Random unitaries in between
+# ensure that the parameters do not simply decouple. Note that we use ``x[..., p]``
+# to access the parameters, so that the cost function accepts a batch of parameter
+# sets as well.
+
+
+def make_multi_cost(N, P, seed):
+    """Create a cost function with P parameters with N frequencies each."""
+    dev = qml.device("default.qubit", wires=N)
+    unitaries = [unitary_group.rvs(2**N, random_state=rnd.default_rng(seed + p)) for p in range(P)]
+
+    @jax.jit
+    @qml.qnode(dev, interface="jax")
+    def cost(x):
+        """Cost function on N qubits with P parameters."""
+        qml.QubitStateVector(random_state(N, seed), wires=dev.wires)
+        for p in range(P):
+            for w in dev.wires:
+                qml.RZ(x[..., p], wires=w)
+            qml.QubitUnitary(unitaries[p], wires=dev.wires)
+        return qml.expval(qml.Hermitian(random_observable(N, seed), wires=dev.wires))
+
+    return cost
+
+
+def coordinate_reconstructions(fun, params, shifts, K):
+    """Reconstruct a function along all coordinates through params, using a single batch.
+
+    The shifts have to contain 0, which is evaluated only once for all coordinates.
+    """
+    num_params = len(params)
+    zero_index = np.argmin(np.abs(shifts))
+    nonzero_shifts = np.delete(shifts, zero_index)
+    # Parameter sets shifted along a single coordinate; block d shifts coordinate d
+    offsets = np.kron(np.eye(num_params), nonzero_shifts[:, None])
+    evaluations = fun(np.vstack([params, params + offsets]))
+    # Collect the evaluations into a matrix with one column per coordinate
+    E_shifts = evaluations[1:].reshape((num_params, len(nonzero_shifts))).T
+    E_shifts = np.insert(E_shifts, zero_index, evaluations[0], axis=0)
+    # Reconstructions of all coordinates on the grid of K at once
+    return K @ E_shifts
+
+
+###############################################################################
+# We compare this to reconstructing along each coordinate with
+# ``full_reconstruction_equ`` from above, and evaluating the reconstructions on the
+# grid ``X``, which would be used, e.g., to find the minimum along each coordinate.
+# We also check the result against a direct evaluation of the cost function
+# along all coordinates.
+
+import time
+
+
+def loop_reconstructions(fun, params, R):
+    """Reconstruct a function along all coordinates with full_reconstruction_equ."""
+    E_loop = []
+    for d in range(len(params)):
+        e_d = np.eye(len(params))[d]
+        recon = full_reconstruction_equ(lambda t: fun(params + t * e_d), R)
+        E_loop.append(np.array(list(map(recon, X))))
+    return np.array(E_loop).T
+
+
+N, P = 3, 8
+multi_cost = make_multi_cost(N, P, seed)
+params = rnd.default_rng(seed).random(P) * 2 * np.pi
+shifts = 2 * np.arange(-N, N + 1) * np.pi / (2 * N + 1)
+K = reconstruction_kernel(X, shifts)
+
+# Call both versions once, so that the JIT compilation of the cost function is not timed
+E_batched = coordinate_reconstructions(multi_cost, params, shifts, K)
+E_loop = loop_reconstructions(multi_cost, params, N)
+
+start = time.process_time()
+E_batched = coordinate_reconstructions(multi_cost, params, shifts, K)
+time_batched = time.process_time() - start
+
+start = time.process_time()
+E_loop = loop_reconstructions(multi_cost, params, N)
+time_loop = time.process_time() - start
+
+E_direct = np.array([multi_cost(params + np.outer(X, np.eye(P)[d])) for d in range(P)]).T
+print(f"Coordinate-wise reconstructions match the loop version: {np.allclose(E_batched, E_loop)}")
+print(f"Coordinate-wise reconstructions match the cost function: {np.allclose(E_batched, E_direct)}")
+print(f"Time for {P} coordinates, loop: {time_loop:.3f}s, batched: {time_batched:.3f}s")
+
+###############################################################################
+# The batched version yields the same reconstructions as before, at a fraction of the
+# cost. Within an optimizer, the kernel matrix :math:`K` is computed only once as well,
+# so that each step only costs a single broadcasted execution of the circuit and a
+# matrix product.
+#
 # And this is all we want to show here about univariate function reconstructions and generalized
 # parameter shift rules.
 # Note that the techniques above can partially be extended to frequencies that are not
@@ -17,7 +17,7 @@ Understanding the Haar measure
     tutorial_barren_plateaus Barren plateaus in quantum neural networks
 
 
-*Author: Olivia Di Matteo — Posted: 22 March 2021. Last updated: 22 March 2021.*
+*Author: Olivia Di Matteo — Posted: 22 March 2021. Last updated: 18 October 2026.*
 
 If you've ever dug into the literature about random quantum circuits,
 variational ansatz structure, or anything related to the structure and
@@ -179,38 +179,40 @@ import matplotlib.pyplot as plt
 # set the random seed
 np.random.seed(42)
 
-# Use the mixed state simulator to save some steps in plotting later
-dev = qml.device('default.mixed', wires=1)
+dev = qml.device('default.qubit', wires=1)
 
 @qml.qnode(dev)
-def not_a_haar_random_unitary():
-    # Sample all parameters from their flat uniform distribution
-    phi, theta, omega = 2 * np.pi * np.random.uniform(size=3)
+def not_a_haar_random_unitary(phi, theta, omega):
     qml.Rot(phi, theta, omega, wires=0)
     return qml.state()
 
 num_samples = 2021
 
-not_haar_samples = [not_a_haar_random_unitary() for _ in range(num_samples)]
+# Sample all parameters from their flat uniform distribution. Passing arrays
+# of parameters broadcasts the circuit, so all samples come from one execution.
+phi, theta, omega = 2 * np.pi * np.random.uniform(size=(3, num_samples))
+not_haar_samples = not_a_haar_random_unitary(phi, theta, omega)
 
 ######################################################################
 # In order to plot these on the Bloch sphere, we'll need to do one more
-# step, and convert the quantum states into Bloch vectors.
+# step, and convert the quantum states into Bloch vectors. The components of
+# the Bloch vector are the expectation values of the Pauli operators. For a
+# state :math:`\vert \psi \rangle = a \vert 0 \rangle + b \vert 1 \rangle`,
+# they are
+#
+# .. math::
+#
+#    (\langle X \rangle, \langle Y \rangle, \langle Z \rangle) =
+#    (2\hbox{Re}(a^*b), 2\hbox{Im}(a^*b), |a|^2 - |b|^2),
+#
+# which we evaluate for the whole array of states at once. This function, together
+# with the batched samplers used later on, can be found in the
+# :download:`haar_sampling.py </demonstrations/haar_sampling/haar_sampling.py>` module.
 #
 
-X = np.array([[0, 1], [1, 0]])
-Y = np.array([[0, -1j], [1j, 0]])
-Z = np.array([[1, 0], [0, -1]])
-
-# Used the mixed state simulator so we could have the density matrix for this part!
-def convert_to_bloch_vector(rho):
-    """Convert a density matrix to a Bloch vector."""
-    ax = np.trace(np.dot(rho, X)).real
-    ay = np.trace(np.dot(rho, Y)).real
-    az = np.trace(np.dot(rho, Z)).real
-    return [ax, ay, az]
+from haar_sampling.haar_sampling import states_to_bloch_vectors
 
-not_haar_bloch_vectors = np.array([convert_to_bloch_vector(s) for s in not_haar_samples])
+not_haar_bloch_vectors = states_to_bloch_vectors(not_haar_samples)
 
 ######################################################################
 # With this done, let's find out where our "uniformly random" states ended up:
@@ -272,18 +274,24 @@ class sin_prob_dist(rv_continuous):
         # The 0.5 is so that the distribution is normalized
         return 0.5 * np.sin(theta)
 
+    def _ppf(self, q):
+        # Inverse of the cumulative distribution function (1 - cos(theta)) / 2,
+        # so that scipy does not have to invert it numerically for every sample
+        return np.arccos(1 - 2 * q)
+
 # Samples of theta should be drawn from between 0 and pi
 sin_sampler = sin_prob_dist(a=0, b=np.pi)
 
 @qml.qnode(dev)
-def haar_random_unitary():
-    phi, omega = 2 * np.pi * np.random.uniform(size=2) # Sample phi and omega as normal
-    theta = sin_sampler.rvs(size=1) # Sample theta from our new distribution
+def haar_random_unitary(phi, theta, omega):
     qml.Rot(phi, theta, omega, wires=0)
     return qml.state()
 
-haar_samples = [haar_random_unitary() for _ in range(num_samples)]
-haar_bloch_vectors = np.array([convert_to_bloch_vector(s) for s in haar_samples])
+phi, omega = 2 * np.pi * np.random.uniform(size=(2, num_samples)) # Sample phi and omega as normal
+theta = sin_sampler.rvs(size=num_samples) # Sample theta from our new distribution
+
+haar_samples = haar_random_unitary(phi, theta, omega)
+haar_bloch_vectors = states_to_bloch_vectors(haar_samples)
 
 plot_bloch_sphere(haar_bloch_vectors)
 
@@ -513,24 +521,40 @@ def qr_haar(N):
     # Step 2
     Q, R = qr(Z)
 
-    # Step 3
-    Lambda = np.diag([R[i, i] / np.abs(R[i, i]) for i in range(N)])
+    # Step 3: the diagonal entries of Lambda
+    Lambda = np.diag(R) / np.abs(np.diag(R))
 
-    # Step 4
-    return np.dot(Q, Lambda)
+    # Step 4: multiplying by a diagonal matrix from the right rescales the columns
+    return Q * Lambda
 
 ######################################################################
+# None of these steps require us to handle one matrix at a time. ``np.linalg.qr``
+# decomposes a whole stack of matrices of shape ``(batch_size, N, N)`` in a
+# single call, and the diagonals of all the :math:`R` matrices are broadcast
+# over the columns of the corresponding :math:`Q`. This is what the
+# ``haar_unitaries`` function of our module does:
+#
+# .. code-block:: python
+#
+#     Z = rng.standard_normal(shape) + 1j * rng.standard_normal(shape)
+#     Q, R = np.linalg.qr(Z)
+#     diag = np.diagonal(R, axis1=-2, axis2=-1)
+#     return Q * (diag / np.abs(diag))[..., np.newaxis, :]
+#
 # Let's check that this method actually generates Haar-random unitaries
-# by trying it out for :math:`N=2` and plotting on the Bloch sphere.
+# by trying it out for :math:`N=2` and plotting on the Bloch sphere. All
+# unitaries are again applied in a single broadcast execution.
 #
 
+from haar_sampling.haar_sampling import haar_unitaries
+
 @qml.qnode(dev)
-def qr_haar_random_unitary():
-    qml.QubitUnitary(qr_haar(2), wires=0)
+def qr_haar_random_unitary(U):
+    qml.QubitUnitary(U, wires=0)
     return qml.state()
 
-qr_haar_samples = [qr_haar_random_unitary() for _ in range(num_samples)]
-qr_haar_bloch_vectors = np.array([convert_to_bloch_vector(s) for s in qr_haar_samples])
+qr_haar_samples = qr_haar_random_unitary(haar_unitaries(2, num_samples, rng=42))
+qr_haar_bloch_vectors = states_to_bloch_vectors(qr_haar_samples)
 plot_bloch_sphere(qr_haar_bloch_vectors)
 
 ######################################################################
@@ -567,8 +591,46 @@ plot_bloch_sphere(qr_haar_bloch_vectors)
 #
 #    Use the ``qr_haar`` function above to generate random unitaries and construct
 #    a distribution of their eigenvalues. Then, comment out the lines for steps 3 and
-#    4 and do the same---you'll find that the distribution is no longer uniform.
-#    Check out reference [#Mezzadri2006]_ for additional details and examples.
+#    4 (or pass ``fix_phases=False`` to ``haar_unitaries``) and do the same---you'll
+#    find that the distribution is no longer uniform. Check out reference
+#    [#Mezzadri2006]_ for additional details and examples.
+#
+# Since everything is batched, sampling at scale is cheap. A million single-qubit
+# unitaries and their Bloch vectors take about a second. If the states are
+# uniformly distributed over the sphere, the Bloch vectors average to zero, and
+# each of their squared components averages to :math:`1/3`.
+
+many_unitaries = haar_unitaries(2, 10**6, rng=42)
+
+# Applying a unitary to |0> picks out its first column
+many_bloch_vectors = states_to_bloch_vectors(many_unitaries[:, :, 0])
+
+print(f"Mean Bloch vector: {np.round(many_bloch_vectors.mean(axis=0), 3)}")
+print(f"Mean squared components: {np.round((many_bloch_vectors**2).mean(axis=0), 3)}")
+
+######################################################################
+# For larger unitaries, a stack of them quickly fills up the memory, so
+# ``haar_unitary_chunks`` generates them in chunks of a given size. As a simple
+# test of the phase correction on 8 qubits, we look at the squared magnitude of
+# the trace, which averages to exactly 1 over the Haar measure for any
+# :math:`N` [#Meckes2014]_.
+
+from haar_sampling.haar_sampling import haar_unitary_chunks
+
+def mean_squared_trace(N, num_samples, fix_phases=True):
+    squared_traces = [
+        np.abs(np.trace(U, axis1=1, axis2=2)) ** 2
+        for U in haar_unitary_chunks(N, num_samples, rng=42, fix_phases=fix_phases)
+    ]
+    return np.mean(np.concatenate(squared_traces))
+
+print(f"With the phase correction:    {mean_squared_trace(2**8, 500):.3f}")
+print(f"Without the phase correction: {mean_squared_trace(2**8, 500, fix_phases=False):.3f}")
+
+######################################################################
+# Without steps 3 and 4, the unitaries are far from Haar-random. With them,
+# generating :math:`10^4` unitaries on 8 qubits is simply a matter of running
+# through more chunks.
 
 ######################################################################
 # Fun (and not-so-fun) facts
@@ -14,7 +14,7 @@ Here comes the SU(N): multivariate quantum gates and gradients
    tutorial_unitary_designs Unitary designs and their uses in quantum computing
 
 
-*Author: David Wierichs — Posted: 03 April 2023.*
+*Author: David Wierichs — Posted: 03 April 2023. Last updated: 18 October 2026.*
 
 How do we choose an ansatz when designing a quantum circuit for a variational
 quantum algorithm? And what happens if we do not start with elementary hardware-friendly
@@ -370,6 +370,214 @@ plt.show()
 # As shown in App. F3 of [#wiersema]_, this scale is indeed close to the optimal choice
 # if we were to compute the gradient with 100 shots per circuit.
 #
+# Batching the gradient recipes
+# -----------------------------
+#
+# The implementations above evaluate the circuits of the finite difference and the
+# stochastic parameter-shift recipes one at a time, and only for a single parameter.
+# For the histograms, this amounts to hundreds of thousands of separate QNode calls.
+# However, every circuit of both recipes consists of a single unitary that is composed
+# of (at most) three matrices. We can therefore compute all these unitaries classically
+# and evaluate the circuits in a single call, using parameter broadcasting with
+# ``qml.QubitUnitary``.
+#
+# Two ingredients can be prepared once and reused across calls and optimization steps.
+# The fixed gates :math:`\exp(\pm i\frac{\pi}{4}P_m)` that replace the Pauli rotation
+# in the auxiliary circuit do not depend on :math:`\boldsymbol{\theta}` at all.
+# Moreover, all unitaries :math:`\exp(i\tau\sum_m\theta_mP_m)` for different
+# splitting times :math:`\tau` follow from a single eigendecomposition of the Hermitian
+# matrix :math:`\sum_m\theta_mP_m`, which we cache for the parameters we encounter.
+#
+# The class below bundles these ingredients for a circuit consisting of a single
+# :math:`\mathrm{SU}(N)` gate on any number of qubits. We measure the observable via its
+# matrix, which allows the device to compute the expectation values for all
+# circuits in one vectorized operation.
+
+from scipy.linalg import expm
+
+
+class SUNGradient:
+    """Batched central difference and stochastic parameter-shift gradients for a
+    circuit consisting of a single ``qml.SpecialUnitary`` gate followed by a measurement."""
+
+    def __init__(self, observable, wires, shots=None, delta=0.75):
+        self.wires = wires
+        self.dim = 2 ** len(wires)
+        self.delta = delta
+        self.basis = qml.ops.qubit.special_unitary.pauli_basis_matrices(len(wires))
+        self.num_params = len(self.basis)
+        self.shift_gates = np.array(
+            [[expm(1j * sign * np.pi / 4 * P) for P in self.basis] for sign in [1.0, -1.0]]
+        )
+        self._eigh_cache = {}
+
+        obs_matrix = qml.matrix(observable, wire_order=wires)
+        dev = qml.device("default.qubit", wires=wires, shots=shots)
+
+        @qml.qnode(dev)
+        def circuit(U):
+            qml.QubitUnitary(U, wires=wires)
+            return qml.expval(qml.Hermitian(obs_matrix, wires=wires))
+
+        self.circuit = circuit
+
+    def eigh(self, theta):
+        """Eigendecomposition of the generator sum_m theta_m P_m, cached by parameter values."""
+        key = np.asarray(theta).tobytes()
+        if key not in self._eigh_cache:
+            if len(self._eigh_cache) >= 128:
+                self._eigh_cache.clear()
+            self._eigh_cache[key] = np.linalg.eigh(np.tensordot(theta, self.basis, axes=1))
+        return self._eigh_cache[key]
+
+    def matrices(self, theta, times):
+        """The matrices of qml.SpecialUnitary(t * theta) for an array of times t."""
+        evals, evecs = self.eigh(theta)
+        phases = np.exp(1j * np.multiply.outer(times, evals))
+        return np.einsum("ij,tj,kj->tik", evecs, phases, evecs.conj())
+
+    def unitaries(self, theta, num_pairs, method):
+        """Unitaries of the (+, -) circuit pairs of all parameters, with num_pairs[m] pairs
+        for parameter m, together with the parameter index of each pair."""
+        param_idx = np.repeat(np.arange(self.num_params), num_pairs)
+
+        if method == "central":
+            signs = np.array([1.0, -1.0])[:, None, None]
+            shifted = theta + self.delta / 2 * signs * np.eye(self.num_params)
+            evals, evecs = np.linalg.eigh(np.tensordot(shifted, self.basis, axes=1))
+            U = np.einsum("...ij,...j,...kj->...ik", evecs, np.exp(1j * evals), evecs.conj())
+            return U[:, param_idx], param_idx
+
+        # Stochastic parameter-shift rule with one splitting time per pair
+        taus = np.random.random(len(param_idx))
+        pre = self.matrices(theta, taus)
+        post = self.matrices(theta, 1 - taus)
+        return post @ self.shift_gates[:, param_idx] @ pre, param_idx
+
+    def __call__(self, theta, num_pairs, method="stochastic"):
+        """Compute the gradient with a single broadcasted execution.
+        Returns the gradient and the variance of the single-pair estimates per parameter."""
+        num_pairs = np.broadcast_to(num_pairs, (self.num_params,))
+        U, param_idx = self.unitaries(np.asarray(theta), num_pairs, method)
+        vals = np.reshape(self.circuit(U.reshape(-1, self.dim, self.dim)), (2, -1))
+
+        diffs = vals[0] - vals[1]
+        if method == "central":
+            diffs = diffs / self.delta
+
+        # Average the pairs of each parameter, and estimate the variance of a single pair
+        grad = np.bincount(param_idx, weights=diffs, minlength=self.num_params) / num_pairs
+        sq_mean = np.bincount(param_idx, weights=diffs**2, minlength=self.num_params) / num_pairs
+        var = (sq_mean - grad**2) * num_pairs / np.maximum(num_pairs - 1, 1)
+        return grad, var
+
+
+##############################################################################
+# Let's compute the full gradient of our toy circuit with both recipes. Each of the
+# following lines uses a single QNode call for *all* parameters:
+
+sun_gradient = SUNGradient(H, wires=[0])
+print(f"Central difference:         {sun_gradient(theta, 1, 'central')[0]}")
+print(f"Stochastic parameter-shift: {sun_gradient(theta, 10, 'stochastic')[0]}")
+print(f"Custom SU(N) gradient:      {np.array(sun_grad(theta))}")
+
+##############################################################################
+# This makes large numbers of splitting times cheap. Let's time the loop-based
+# implementation from above against the batched one for 100 gradient estimates
+# with 100 splitting times each:
+
+import time
+
+start = time.process_time()
+loop_grads = [stochastic_parshift_grad(theta, 100) for _ in range(100)]
+loop_time = time.process_time() - start
+
+start = time.process_time()
+batched_grads = [sun_gradient(theta, 100)[0][1] for _ in range(100)]
+batched_time = time.process_time() - start
+
+print(f"Loop:    {loop_time:.3f}s, mean = {np.mean(loop_grads):.5f}, std = {np.std(loop_grads):.5f}")
+print(
+    f"Batched: {batched_time:.3f}s, mean = {np.mean(batched_grads):.5f}, "
+    f"std = {np.std(batched_grads):.5f}"
+)
+
+##############################################################################
+# The batched version takes about as long as the just-in-time compiled loop, but
+# computes the derivatives with respect to all three parameters in this time.
+#
+# Shot-adaptive gradients
+# ~~~~~~~~~~~~~~~~~~~~~~~
+#
+# On hardware, the total number of shots we can spend on a gradient is limited.
+# Let's consider a budget of single-shot circuit pairs, each with a fresh splitting time,
+# that we distribute among the parameters. Spending the same number of pairs
+# :math:`n_m` on each parameter is not optimal: the total variance
+# :math:`\sum_m\sigma_m^2/n_m` of the gradient estimate, where :math:`\sigma_m^2` is
+# the variance of a single-pair estimate for parameter :math:`m`, is minimized by
+# choosing :math:`n_m` proportional to :math:`\sigma_m`. We do not know the
+# variances, but we can estimate them from the previous gradient evaluation:
+
+
+def allocate_pairs(variances, budget, min_pairs=10):
+    """Distribute a budget of circuit pairs proportionally to the estimated standard deviations."""
+    std = np.sqrt(np.maximum(variances, 1e-12))
+    num_params = len(variances)
+    return min_pairs + np.floor((budget - num_params * min_pairs) * std / std.sum()).astype(int)
+
+
+##############################################################################
+# This pays off if the variances differ between the parameters. For a
+# two-qubit gate :math:`U(\boldsymbol{\theta})` with fifteen parameters, measured in
+# the observable :math:`Z_0` and close to the identity, the shifts along generators that
+# act trivially on the first qubit barely change the measured state, so that the
+# corresponding estimates fluctuate very little. Let's compare the mean squared
+# error of the gradient for a budget of 1500 pairs, i.e., 3000 single-shot circuits,
+# distributed uniformly or adaptively. As the variance estimates from a single
+# gradient evaluation are noisy, the adaptive allocation uses an exponential moving
+# average of the estimates from previous repetitions, similar to the
+# :doc:`Rosalin optimizer </demos/tutorial_rosalin>`. Each gradient is computed
+# with a single device execution.
+
+obs = qml.PauliZ(0)
+shot_gradient = SUNGradient(obs, wires=[0, 1], shots=1)
+theta_2q = jnp.array(0.05 * np.random.randn(15))
+dev_2q = qml.device("default.qubit", wires=2)
+
+
+@qml.qnode(dev_2q, interface="jax", diff_method="parameter-shift")
+def exact_circuit(theta):
+    qml.SpecialUnitary(theta, wires=[0, 1])
+    return qml.expval(obs)
+
+
+exact_grad_2q = np.array(jax.grad(exact_circuit)(theta_2q))
+
+budget = 1500
+uniform_pairs = np.full(15, budget // 15)
+adaptive_pairs = uniform_pairs
+var_estimate = None
+errors = {"uniform": [], "adaptive": []}
+for _ in range(100):
+    grad, _ = shot_gradient(theta_2q, uniform_pairs)
+    errors["uniform"].append(np.sum((grad - exact_grad_2q) ** 2))
+
+    grad, var = shot_gradient(theta_2q, adaptive_pairs)
+    errors["adaptive"].append(np.sum((grad - exact_grad_2q) ** 2))
+    # Smooth the variance estimates over the repetitions before allocating the pairs
+    var_estimate = var if var_estimate is None else 0.9 * var_estimate + 0.1 * var
+    adaptive_pairs = allocate_pairs(var_estimate, budget)
+
+print(f"Pairs per parameter (adaptive): {adaptive_pairs}")
+for name, err in errors.items():
+    print(f"Mean squared error ({name}): {np.mean(err):.5f}")
+
+##############################################################################
+# The adaptive allocation spends more shots on the parameters whose estimates
+# fluctuate strongly, and fewer on the seven generators that act on the first qubit
+# via :math:`I` or :math:`Z` only. This reduces the error of the gradient estimate for
+# the same total number of shots.
+#
 # Comparing ansatz structures
 # ---------------------------
 #
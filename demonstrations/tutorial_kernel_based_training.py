@@ -15,7 +15,7 @@ Kernel-based training of quantum models with scikit-learn
 
     tutorial_variational_classifier Variational classifier
 
-*Author: Maria Schuld — Posted: 03 February 2021. Last updated: 3 February 2021.*
+*Author: Maria Schuld — Posted: 03 February 2021. Last updated: 18 October 2026.*
 
 Over the last few years, quantum machine learning research has provided a lot of insights on
 how we can understand and train quantum circuits as machine learning models.
@@ -164,7 +164,7 @@ import numpy as np
 import torch
 from torch.nn.functional import relu
 
-from sklearn.svm import SVC
+from sklearn.svm import SVC, LinearSVC
 from sklearn.datasets import load_iris
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
@@ -353,6 +353,172 @@ circuit_evals_kernel(n_data=len(X), split=len(X_train) /(len(X_train) + len(X_te
 # as a sanity check.
 #
 
+
+######################################################################
+# Computing the kernel matrix more efficiently
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#
+# The ``kernel_matrix`` function above is the most straightforward implementation,
+# but it wastes a lot of circuit evaluations. Two properties of the quantum kernel
+# help us here: the Gram matrix is *symmetric*, :math:`\kappa(x, x') = \kappa(x', x)`,
+# and the kernel is *normalised*, :math:`\kappa(x, x) = 1`. For a square Gram matrix we
+# therefore only need the :math:`M(M-1)/2` entries above the diagonal.
+#
+# Furthermore, ``AngleEmbedding`` supports parameter broadcasting, so we can feed all
+# pairs :math:`(x^i, x^j)` into the ``kernel`` QNode at once. The device then
+# runs them as a single batched execution.
+#
+
+
+def square_kernel_matrix_batched(X):
+    """Compute the Gram matrix of X from the upper triangle only,
+       evaluating all pairs in one broadcasted execution."""
+    n = len(X)
+    rows, cols = np.triu_indices(n, k=1)
+
+    # the kernel is normalised, so the diagonal is one
+    K = np.eye(n)
+    if n > 1:
+        K[rows, cols] = kernel(X[rows], X[cols])
+        K[cols, rows] = K[rows, cols]
+    return K
+
+
+num_executions_before = dev_kernel.num_executions
+K_batched = square_kernel_matrix_batched(X_train)
+print("Executions:", dev_kernel.num_executions - num_executions_before)
+print("Same Gram matrix:", np.allclose(K_batched[:5, :5], kernel_matrix(X_train[:5], X_train[:5])))
+
+
+######################################################################
+# On a simulator we can go one step further. Each entry of the Gram matrix is
+# the squared overlap of two embedded states, so we only need to simulate the embedding
+# *once per data point* and can then obtain all entries from a single matrix product,
+#
+# .. math:: K = |\Phi_A^* \Phi_B^T|^2,
+#
+# where the rows of :math:`\Phi_A` and :math:`\Phi_B` are the state vectors
+# :math:`|\phi(x)\rangle` of the data in A and B. This turns :math:`M^2` simulations
+# into :math:`M` simulations plus a matrix multiplication. Note that, like
+# ``diff_method="backprop"``, this trick requires access to the state vector and
+# is therefore only available on simulators.
+#
+
+dev_state = qml.device("default.qubit", wires=n_qubits)
+
+@qml.qnode(dev_state, interface="autograd")
+def embedding_state(x):
+    """The embedded quantum state."""
+    AngleEmbedding(x, wires=range(n_qubits))
+    return qml.state()
+
+
+def kernel_matrix_from_states(A, B):
+    """Compute the kernel matrix from the embedded states of A and B."""
+    states_A = embedding_state(A)
+    states_B = states_A if B is A else embedding_state(B)
+    return np.abs(states_A.conj() @ states_B.T) ** 2
+
+
+######################################################################
+# The new kernel matrix function can be passed to the SVM just like before:
+#
+
+svm_states = SVC(kernel=kernel_matrix_from_states).fit(X_train, y_train)
+print("accuracy on test set:", accuracy_score(svm_states.predict(X_test), y_test))
+print("Executions:", dev_state.num_executions)
+
+######################################################################
+# Training and prediction now only took a handful of (broadcasted) executions.
+#
+# Approximating the kernel with landmark points
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#
+# Even if every kernel evaluation is cheap, the SVM still needs all
+# :math:`M^2` entries of the Gram matrix for training and :math:`M M_{\rm pred}`
+# entries for prediction. For large datasets, we can instead use the
+# `Nyström method <https://en.wikipedia.org/wiki/Low-rank_matrix_approximations#Nystr%C3%B6m_approximation>`__,
+# which approximates the Gram matrix by the kernel values between all data points
+# and a small set of :math:`r` randomly selected *landmark* points :math:`x^{(1)}, \dots, x^{(r)}`,
+#
+# .. math:: K \approx K_{Mr} K_{rr}^{-1} K_{rM}.
+#
+# Equivalently, every data point is mapped to an :math:`r`-dimensional feature vector
+# :math:`K_{rr}^{-1/2} (\kappa(x, x^{(1)}), \dots, \kappa(x, x^{(r)}))^T`, on which we can train an
+# ordinary *linear* classifier. This needs only :math:`(M + M_{\rm pred}) r` kernel
+# evaluations.
+#
+# We first need the kernel between two arbitrary data sets, again evaluated
+# as a single broadcasted execution:
+#
+
+
+def kernel_matrix_batched(A, B):
+    """Compute the kernel matrix of A and B, evaluating all pairs
+       in one broadcasted execution."""
+    rows, cols = np.divmod(np.arange(len(A) * len(B)), len(B))
+    return np.reshape(kernel(A[rows], B[cols]), (len(A), len(B)))
+
+
+def nystroem_feature_map(landmarks):
+    """Construct the Nyström feature map for the given landmark points."""
+    K_landmarks = square_kernel_matrix_batched(landmarks)
+
+    # compute the inverse square root of the landmark Gram matrix,
+    # dropping directions that are numerically zero
+    eigvals, eigvecs = np.linalg.eigh(K_landmarks)
+    keep = eigvals > 1e-10
+    projection = eigvecs[:, keep] / np.sqrt(eigvals[keep])
+
+    def feature_map(X):
+        return kernel_matrix_batched(X, landmarks) @ projection
+
+    return feature_map
+
+
+######################################################################
+# The rank :math:`r` controls the trade-off between the accuracy of the approximation and
+# the number of kernel evaluations. Let us compare the approximated Gram matrix with the
+# exact one and train a linear SVM on the Nyström features for a few different ranks:
+#
+
+K_exact = kernel_matrix_from_states(X_train, X_train)
+
+for rank in [2, 4, 8, 16]:
+    landmarks = X_train[np.random.choice(len(X_train), rank, replace=False)]
+    feature_map = nystroem_feature_map(landmarks)
+
+    features_train = feature_map(X_train)
+    error = np.linalg.norm(features_train @ features_train.T - K_exact) / np.linalg.norm(K_exact)
+
+    svm_nystroem = LinearSVC().fit(features_train, y_train)
+    acc = accuracy_score(svm_nystroem.predict(feature_map(X_test)), y_test)
+
+    print(f"rank {rank:2d}: relative error {error:.3f}, accuracy on test set {acc:.2f}")
+
+
+######################################################################
+# The number of kernel evaluations is now linear in the size of the data set:
+#
+
+
+def circuit_evals_nystroem(n_data, split, rank):
+    """Compute how many kernel evaluations one needs for training and
+       prediction with a Nyström approximation of the kernel."""
+
+    M = int(np.ceil(split * n_data))
+    Mpred = n_data - M
+
+    n_landmarks = rank * (rank - 1) // 2
+    n_training = M * rank
+    n_prediction = Mpred * rank
+
+    return n_landmarks + n_training + n_prediction
+
+
+circuit_evals_nystroem(n_data=len(X), split=len(X_train) /(len(X_train) + len(X_test)), rank=8)
+
+
 ######################################################################
 # A similar example using variational training
 # --------------------------------------------
@@ -11,7 +11,7 @@ r"""Training and evaluating quantum kernels
     tutorial_data_reuploading_classifier Data-reuploading classifier
 
 *Authors: Peter-Jan Derks, Paul K. Faehrmann, Elies Gil-Fuster, Tom
-Hubregtsen, Johannes Jakob Meyer and David Wierichs — Posted: 24 June 2021. Last updated: 18 November 2021.*
+Hubregtsen, Johannes Jakob Meyer and David Wierichs — Posted: 24 June 2021. Last updated: 18 October 2026.*
 
 Kernel methods are one of the cornerstones of classical machine learning.
 Here we are concerned with kernels that can be evaluated on quantum computers,
@@ -531,6 +531,11 @@ def target_alignment(
         assume_normalized_kernel=assume_normalized_kernel,
     )
 
+    return kernel_matrix_alignment(K, Y, rescale_class_labels=rescale_class_labels)
+
+
+def kernel_matrix_alignment(K, Y, rescale_class_labels=True):
+    """Kernel-target alignment between a kernel matrix and labels."""
     if rescale_class_labels:
         nplus = np.count_nonzero(np.array(Y) == 1)
         nminus = len(Y) - nplus
@@ -609,6 +614,116 @@ trained_plot_data = plot_decision_boundaries(svm_trained, plt.gca())
 # one hand it can adjust itself to the dataset, and on the other hand
 # is not expected to suffer from bad generalisation.
 #
+# Scaling up the alignment training
+# ---------------------------------
+#
+# In the training loop above, every call to ``target_alignment`` builds the
+# kernel matrix pair by pair, running ``ansatz`` and ``adjoint_ansatz`` for each
+# entry. Most of this work is redundant: the kernel value is the overlap of two embedded
+# states, and each of these states only depends on a *single* datapoint and the current
+# parameters. On a simulator, we can therefore compute the embedded state
+# :math:`|\psi(\boldsymbol{x}_i)\rangle` once per datapoint and obtain the full kernel matrix
+# from the overlaps
+#
+# .. math::
+#    K_{ij} = | \langle\psi(\boldsymbol{x}_i)|\psi(\boldsymbol{x}_j)\rangle|^2,
+#
+# which is a single matrix product of the stacked state vectors.
+#
+# The ``layer`` function accesses the features via ``x[i % len(x)]``, so passing the
+# *transposed* data ``X.T`` evaluates the embedding for all datapoints at once
+# using parameter broadcasting:
+
+dev_state = qml.device("default.qubit", wires=5, shots=None)
+
+
+@qml.qnode(dev_state, interface="autograd")
+def embedding_state(x, params):
+    ansatz(x, params, wires=wires)
+    return qml.state()
+
+
+##############################################################################
+# To avoid recomputing states of datapoints that appear several times, for example
+# in a randomly drawn minibatch or when reporting the alignment on the full
+# dataset, we store the states for the current parameters in a small cache.
+# The cache is invalidated whenever a different parameter array is passed, which
+# happens after every optimization step, or when the values of the cached parameter
+# array have changed, for example by an in-place update. Because the states are
+# stored as they are computed, the cached states remain differentiable and the
+# gradient of the alignment flows through them.
+
+
+class EmbeddingStateCache:
+    """Cache of the embedded states of the datapoints in X for the current parameters."""
+
+    def __init__(self, X):
+        self.X = X
+        self._params = None
+        self._param_values = None
+        self._states = {}
+
+    def states(self, indices, params):
+        """Embedded states of the datapoints with the given indices."""
+        # States computed for another array must not be reused, even with equal values,
+        # as they may belong to a different gradient computation
+        param_values = qml.math.toarray(params)
+        if params is not self._params or not np.array_equal(param_values, self._param_values):
+            self._params = params
+            self._param_values = param_values.copy()
+            self._states = {}
+
+        indices = [int(i) for i in indices]
+        missing = [i for i in dict.fromkeys(indices) if i not in self._states]
+        if missing:
+            new_states = embedding_state(self.X[missing].T, params)
+            self._states.update(zip(missing, new_states))
+
+        return np.stack([self._states[i] for i in indices])
+
+
+def cached_target_alignment(indices, Y, params, cache, rescale_class_labels=True):
+    """Kernel-target alignment computed from the cached embedded states."""
+    states = cache.states(indices, params)
+    K = np.abs(np.conj(states) @ states.T) ** 2
+
+    return kernel_matrix_alignment(K, Y, rescale_class_labels=rescale_class_labels)
+
+
+##############################################################################
+# Let's check that we recover the alignment of the trained kernel on the full
+# dataset, which now only requires a single (broadcasted) execution:
+
+cache = EmbeddingStateCache(X)
+all_indices = np.arange(len(X))
+
+print(f"Alignment from pairwise kernel evaluations: {current_alignment:.3f}")
+print(f"Alignment from cached states: {cached_target_alignment(all_indices, Y, params, cache):.3f}")
+print(f"Device executions: {dev_state.num_executions}")
+
+##############################################################################
+# The training loop looks just like before, but each step now simulates the
+# embedding once per distinct datapoint in the minibatch instead of once per pair:
+
+params_cached = init_params
+opt = qml.GradientDescentOptimizer(0.2)
+
+for i in range(50):
+    subset = np.random.choice(list(range(len(X))), 4)
+    cost = lambda _params: -cached_target_alignment(subset, Y[subset], _params, cache)
+    params_cached = opt.step(cost, params_cached)
+
+    if (i + 1) % 10 == 0:
+        current_alignment = cached_target_alignment(all_indices, Y, params_cached, cache)
+        print(f"Step {i+1} - Alignment = {current_alignment:.3f}")
+
+##############################################################################
+# As the number of simulations now grows linearly with the number of datapoints,
+# and the kernel matrix is a single matrix product, this
+# approach allows to train the alignment on datasets with thousands of samples.
+# Keep in mind that it relies on access to the state vector; on hardware, the
+# kernel entries still have to be estimated pair by pair.
+#
 # References
 # ----------
 #
@@ -11,7 +11,7 @@ QAOA for MaxCut
 .. related::
    tutorial_qaoa_intro Intro to QAOA
 
-*Author: Angus Lowe — Posted: 11 October 2019. Last updated: 13 April 2021.*
+*Author: Angus Lowe — Posted: 11 October 2019. Last updated: 18 October 2026.*
 
 """
 ##############################################################################
@@ -313,6 +313,130 @@ plt.hist(bitstrings2, bins=bins)
 plt.tight_layout()
 plt.show()
 
+##############################################################################
+# A fast path for diagonal cost Hamiltonians
+# ------------------------------------------
+#
+# The implementation above evaluates the objective one edge at a time: for every
+# term :math:`\sigma_z^{j}\sigma_z^{k}`, the full QAOA circuit is simulated anew, and
+# each sample of the final state requires another circuit execution. However,
+# the cost Hamiltonian :math:`C` is *diagonal* in the computational basis. This has
+# three useful consequences:
+#
+# * The value of :math:`C` for every basis state :math:`|z\rangle`, i.e., the number of
+#   edges cut by the partition :math:`z`, can be tabulated once before the optimization.
+# * The operator :math:`U_C(\gamma)` multiplies each amplitude by a phase, which
+#   up to a global phase is :math:`e^{i\gamma C(z)}`, so that it can be applied
+#   as an elementwise multiplication of the state via ``qml.DiagonalQubitUnitary``.
+# * The objective is the dot product of the computational basis probabilities with
+#   the table of cut values, and all terms are obtained from a *single* simulation of
+#   the state per evaluation.
+#
+# We start by computing the cut value of all basis states at once with the helper
+# module :download:`graph_objectives.py </demonstrations/graph_objectives/graph_objectives.py>`,
+# which is shared with other QAOA demos. Bitstrings are encoded as integers, where
+# wire 0 corresponds to the most significant bit, as in ``bitstring_to_int``.
+
+import networkx as nx
+from graph_objectives.graph_objectives import cut_table
+
+print(cut_table(nx.Graph(graph), wires=range(n_wires)))
+
+##############################################################################
+# Using the table, we construct a QNode that returns the probabilities of all
+# bitstrings. Since we evaluate the exact expectation value, we use a device
+# without shots.
+
+
+def diagonal_qaoa_circuit(graph, n_wires):
+    cuts = np.array(cut_table(nx.Graph(graph), wires=range(n_wires)), requires_grad=False)
+    dev_exact = qml.device("default.qubit", wires=n_wires)
+
+    @qml.qnode(dev_exact)
+    def circuit(gammas, betas):
+        for wire in range(n_wires):
+            qml.Hadamard(wires=wire)
+        for gamma, beta in zip(gammas, betas):
+            # U_C only multiplies each amplitude by a phase
+            qml.DiagonalQubitUnitary(np.exp(1j * gamma * cuts), wires=range(n_wires))
+            for wire in range(n_wires):
+                qml.RX(2 * beta, wires=wire)
+        return qml.probs(wires=range(n_wires))
+
+    return circuit, cuts
+
+
+##############################################################################
+# The optimization then proceeds as before. Once optimized, we draw any number of
+# samples from the probabilities in a single call; the samples are integer-encoded
+# bitstrings, so that no conversion is needed.
+
+
+def qaoa_maxcut_fast(graph, n_wires, n_layers=1, steps=30, n_samples=100):
+    circuit, cuts = diagonal_qaoa_circuit(graph, n_wires)
+
+    # minimize the negative of the objective function
+    def objective(params):
+        return -np.dot(circuit(params[0], params[1]), cuts)
+
+    params = 0.01 * np.random.rand(2, n_layers, requires_grad=True)
+    opt = qml.AdagradOptimizer(stepsize=0.5)
+    for i in range(steps):
+        params = opt.step(objective, params)
+
+    probs = circuit(params[0], params[1])
+    bit_strings = np.random.choice(2**n_wires, size=n_samples, p=probs / np.sum(probs))
+    return -objective(params), bit_strings
+
+
+for n_layers in [1, 2]:
+    obj, bit_strings = qaoa_maxcut_fast(graph, n_wires, n_layers=n_layers)
+    most_freq_bit_string = np.argmax(np.bincount(bit_strings))
+    print(
+        "p={:d}: objective = {:.7f}, most frequently sampled bit string is: {:04b}".format(
+            n_layers, obj, most_freq_bit_string
+        )
+    )
+
+##############################################################################
+# We recover the results from above. Note that the objective is now the *exact*
+# expectation value, whereas the implementation above estimates each edge term
+# from a single shot. Let's compare the time it takes to compute the gradient of
+# the objective for ``n_layers=2`` with both implementations:
+
+import time
+
+params = 0.01 * np.random.rand(2, 2, requires_grad=True)
+fast_circuit, fast_cuts = diagonal_qaoa_circuit(graph, n_wires)
+
+
+def edge_objective(params):
+    return -sum(
+        0.5 * (1 - circuit(params[0], params[1], edge=edge, n_layers=2)) for edge in graph
+    )
+
+
+def fast_objective(params):
+    return -np.dot(fast_circuit(params[0], params[1]), fast_cuts)
+
+
+for name, fn in [("One circuit per edge", edge_objective), ("Diagonal fast path", fast_objective)]:
+    start = time.process_time()
+    qml.grad(fn)(params)
+    print(f"{name}: {time.process_time() - start:.4f}s")
+
+##############################################################################
+# As the diagonal fast path only ever simulates a single state per evaluation,
+# its cost no longer grows with the number of edges. This allows us to
+# tackle larger graphs, such as a random 3-regular graph with 12 vertices:
+
+large_graph = nx.random_regular_graph(3, 12, seed=42)
+obj, bit_strings = qaoa_maxcut_fast(list(large_graph.edges), 12, n_layers=2, n_samples=1000)
+large_cuts = cut_table(large_graph, wires=range(12))
+
+print(f"Objective: {obj:.4f}, maximum cut: {np.max(large_cuts)}")
+print(f"Best sampled cut: {np.max(large_cuts[bit_strings])}")
+
 ##############################################################################
 # About the author
 # ----------------
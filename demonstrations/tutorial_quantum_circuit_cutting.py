@@ -12,7 +12,7 @@ Quantum Circuit Cutting
    tutorial_unitary_designs Unitary designs
 
 
-*Authors: Gideon Uchehara, Matija Medvidović, Anuj Apte — Posted: 02 September 2022. Last updated: 02 September 2022.*
+*Authors: Gideon Uchehara, Matija Medvidović, Anuj Apte — Posted: 02 September 2022. Last updated: 18 October 2026.*
 
 Introduction
 -------------------------------------
@@ -473,18 +473,34 @@ optimal_cost = -0.248
 ######################################################################
 # We also define our cost operator :math:`H_{\mathcal{C}}` as a function.
 # Because it is diagonal in the computational basis, we only need to
-# define its action on computational basis bitstrings.
+# define its action on computational basis bitstrings. Every bitstring
+# :math:`x` gets the normalized cost
+#
+# .. math::
+#
+#    H_\mathcal{C}(x) = \frac{1}{|E|} \sum_{(i, j) \in E} (-1)^{x_i + x_j} = \frac{|E| - 2 \, \mathrm{cut}(x)}{|E|},
+#
+# where :math:`\mathrm{cut}(x)` counts the edges whose endpoints lie on
+# different sides of the partition :math:`x`. Since the randomized
+# cutting scheme below calls this function for every single shot, we
+# tabulate the cost of all :math:`2^7` bitstrings once with the helper
+# module :download:`graph_objectives.py </demonstrations/graph_objectives/graph_objectives.py>`,
+# which is shared with other QAOA demos. A batch of samples is then
+# evaluated with a single lookup.
 #
 
+from graph_objectives.graph_objectives import cut_table, evaluate
+
+n_edges = len(graph.edges)
+cost_table = (n_edges - 2 * cut_table(graph, wires=range(len(graph)))) / n_edges
+
 
 def qaoa_cost(bitstring):
 
     bitstring = np.atleast_2d(bitstring)
     # Make sure that we operate correctly on a batch of bitstrings
 
-    z = (-1) ** bitstring[:, graph.edges()]  # Filter out pairs of bits correspondimg to graph edges
-    costs = z.prod(axis=-1).sum(axis=-1)  # Do products and sums
-    return np.squeeze(costs) / len(graph.edges)  # Normalize
+    return np.squeeze(evaluate(bitstring, cost_table))
 
 
 ######################################################################
@@ -570,17 +586,151 @@ def qaoa(params):
 
 ######################################################################
 # We can obtain the cost estimate by simply running ``qaoa`` like a
-# “normal” ``QNode``. Let’s do just that for a grid of values so we can
-# study convergence.
+# “normal” ``QNode``:
+#
+
+print(f"Pauli cut estimate with 1000 shots: {qaoa(optimal_params, shots=1000):.3f}")
+
+######################################################################
+# Reusing fragment executions
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^
+#
+# To study convergence, we would like estimates for a whole grid of shot
+# counts. Calling ``qaoa`` for each of them regenerates the fragments and
+# executes every fragment once per shot, each time with a freshly drawn
+# configuration. However, with :math:`k` cuts there are only :math:`8^k`
+# different measurement and preparation settings, so the same fragment
+# configurations occur over and over again.
+#
+# We therefore split the circuit into fragments only once and let
+# ``qcut.expand_fragment_tapes_mc`` draw the random configurations for the
+# largest shot count. Identical configurations of a fragment are executed
+# only once, with as many shots as they occur, and their samples are
+# distributed back to the corresponding shots. These executions are
+# independent of each other, so they can be spread over a pool of worker
+# processes by passing ``max_workers``. As the worker processes may
+# re-import the calling module, do so only from a script with an
+# ``if __name__ == "__main__":`` guard; here, we run them one after the
+# other. Finally, since the estimate is an average over shots, the estimate
+# for a smaller number of shots is obtained from the first shots of the
+# sample, without any further circuit executions.
+#
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pennylane.transforms import qcut
+
+
+def run_fragment_jobs(jobs, wires):
+    """Executes (tape, shots) pairs and records the time taken by each of them."""
+    device = qml.device("default.qubit", wires=wires)
+    results = []
+    for tape, shots in jobs:
+        start = time.perf_counter()
+        device.shots = int(shots)
+        (res,) = qml.execute([tape], device=device, cache=False, gradient_fn=None)
+        # One column per measurement, one row per shot
+        if isinstance(res, tuple):
+            res = np.stack([np.atleast_1d(r) for r in res], axis=-1)
+        else:
+            res = np.reshape(res, (-1, 1))
+        results.append((res, time.perf_counter() - start))
+    return results
+
+
+def sample_cut_circuit(tape, n_shots, max_workers=1):
+    """Samples a cut circuit with the Pauli cut method and returns, for every shot, the
+    reconstructed bitstring and the sign and weight of its contribution to the estimate."""
+
+    cut_graph = qcut.tape_to_graph(tape)
+    qcut.replace_wire_cut_nodes(cut_graph)
+    fragments, communication_graph = qcut.fragment_graph(cut_graph)
+    fragment_tapes = [qcut.graph_to_tape(f) for f in fragments]
+
+    # One random configuration of every fragment for every shot, and the settings of every
+    # cut (one row per edge of the communication graph) that they correspond to
+    fragment_configs, settings = qcut.expand_fragment_tapes_mc(
+        fragment_tapes, communication_graph, shots=n_shots
+    )
+
+    # A fragment configuration only depends on the settings of the cuts that touch the fragment,
+    # so we execute each distinct configuration only once, with as many shots as it occurs.
+    cuts = list(communication_graph.edges())
+    jobs, job_fragments, job_shots = [], [], []
+    for f, configs in enumerate(fragment_configs):
+        rows = [c for c, (u, v) in enumerate(cuts) if f in (u, v)]
+        _, first_shots, inverse = np.unique(
+            settings[rows], axis=1, return_index=True, return_inverse=True
+        )
+        for u, first_shot in enumerate(first_shots):
+            shots = np.flatnonzero(inverse == u)
+            jobs.append((configs[first_shot], len(shots)))
+            job_fragments.append(f)
+            job_shots.append(shots)
+
+    if max_workers > 1:
+        chunks = [jobs[i::max_workers] for i in range(max_workers)]
+        with ProcessPoolExecutor(max_workers) as pool:
+            chunk_results = list(pool.map(run_fragment_jobs, chunks, [tape.wires] * max_workers))
+    else:
+        chunk_results = [run_fragment_jobs(jobs, tape.wires)]
+
+    results = [None] * len(jobs)
+    for i, chunk_result in enumerate(chunk_results):
+        results[i::max_workers] = chunk_result
+
+    # Reassemble the samples of every shot, and keep track of the cost of each fragment
+    bits = np.zeros((n_shots, len(tape.wires)), dtype=int, requires_grad=False)
+    mid_signs = np.ones(n_shots, requires_grad=False)
+    report = [
+        {"wires": len(t.wires), "configurations": 0, "executed shots": 0, "time (s)": 0.0}
+        for t in fragment_tapes
+    ]
+
+    for f, shots, (res, elapsed) in zip(job_fragments, job_shots, results):
+        terminal_wires = [tape.wires.index(m.wires[0]) for m in fragment_tapes[f].measurements]
+        n_terminal = len(terminal_wires)
+        bits[np.ix_(shots, terminal_wires)] = res[:, :n_terminal]
+        mid_signs[shots] *= np.prod(res[:, n_terminal:], axis=1)
+
+        report[f]["configurations"] += 1
+        report[f]["executed shots"] += len(shots)
+        report[f]["time (s)"] += elapsed
+
+    # Eigenvalues of the measurement settings and weight of the estimator,
+    # following Eq. (35) of Peng et al.
+    evals = np.array([0.5, 0.5, 0.5, -0.5, 0.5, -0.5, 0.5, -0.5], requires_grad=False)
+    weights = 8 ** len(settings) * np.prod(evals[settings], axis=0) * mid_signs
+
+    return bits, weights, report
+
+
+######################################################################
+# We sample :math:`10\,000` shots once, and obtain the estimates for all shot
+# counts from the same data:
 #
 
 n_shots = 10000
 
 shot_counts = np.logspace(1, 4, num=20, dtype=int, requires_grad=False)
-pauli_cost_values = np.zeros_like(shot_counts, dtype=float)
 
-for i, shots in enumerate(shot_counts):
-    pauli_cost_values[i] = qaoa(optimal_params, shots=shots)
+bits, weights, fragment_report = sample_cut_circuit(tape, n_shots)
+
+contributions = weights * qaoa_cost(bits)
+pauli_cost_values = np.cumsum(contributions)[shot_counts - 1] / shot_counts
+
+######################################################################
+# The report shows where the sampling overhead goes. For every fragment, we
+# see how many distinct configurations had to be executed, and how much time
+# was spent simulating them:
+#
+
+for f, entry in enumerate(fragment_report):
+    print(f"Fragment {f}: " + ", ".join(f"{key}: {value:.3g}" for key, value in entry.items()))
+
+print(f"\nCircuit executions: {sum(e['configurations'] for e in fragment_report)}")
+print(f"Executions when running each shot count separately: {len(fragment_report) * np.sum(shot_counts)}")
 
 
 ######################################################################
@@ -592,73 +742,92 @@ for i, shots in enumerate(shot_counts):
 #
 # As noted earlier, the easiest way to mathematically represent the
 # randomized channel-based method is to write down Kraus operators for the
-# relevant channels, :math:`\Psi _0` and :math:`\Psi _1`. Once we have
-# represented them in explicit matrix form, we can simply use ``qml.QubitChannel``.
-#
+# relevant channels, :math:`\Psi _0` and :math:`\Psi _1`. However, there
+# are :math:`d^2` Kraus operators :math:`|i\rangle \langle j|` of size
+# :math:`d \times d`, that is, :math:`d^4` matrix entries per channel,
+# and each of them has to be applied to the density matrix. Already for
+# a handful of cut wires, this becomes prohibitively expensive.
 #
-# To get our matrices, we represent the computational basis set along the
-# :math:`k` cut wires as a unit vector
+# Luckily, we do not need them. Summing over all Kraus operators gives
 #
 # .. math::
 #
-#   \left\vert i \right\rangle \mapsto (0, \ldots, 1,\ldots,0)
+#    \sum_{i,j} |i\rangle \langle j| X |j\rangle \langle i| = \textrm{Tr}(X) \mathbf{1}~,
 #
-# with the 1 positioned at index :math:`i`. Therefore:
+# so both channels are a mixture of the identity channel and the
+# measure-and-prepare channel :math:`\Psi _1`,
 #
 # .. math::
 #
-#    \left\vert i \right\rangle \left\langle j \right\vert \mapsto \begin{pmatrix}
-#        0 & 0 & \cdots & 0 & 0 \\
-#        0 & \ddots & \cdots & 0 & 0 \\
-#        \vdots & 0 & 1 & 0 & \vdots \\
-#        0 & 0 & \cdots & \ddots & 0 \\
-#        0 & 0 & \cdots & 0 & 0 \\
-#    \end{pmatrix}
-#
-# where the 1 sits at column :math:`i` and row :math:`j`.
+#    \Psi _z(X) = a_z X + (1 - a_z) \Psi _1(X)~, \qquad a_0 = \frac{1}{d+1}~, \quad a_1 = 0~.
 #
-# Given this representation, a neat way to get all Kraus operators’ matrix
-# representations is the following:
+# Moreover, :math:`\Psi _1` traces out the cut wires and replaces them by the
+# maximally mixed state. This is the same as replacing every single cut
+# wire by the maximally mixed state, which is what the single-qubit
+# depolarizing channel with :math:`p = 3/4` does. We can therefore apply
+# :math:`\Psi _1` as :math:`k` single-qubit channels with four :math:`2 \times 2` Kraus
+# operators each, and the identity part of :math:`\Psi _0` by simply leaving
+# the wires alone. We collect this structured representation in a small
+# function:
 #
 
 
-def make_kraus_ops(num_wires: int):
+def make_cut_channel(z, wires):
+    """Structured representation of the channel Psi_z on the cut wires. Returns the
+    weight of the identity part and the operations applying the measure-and-prepare part."""
 
-    d = 2**num_wires
+    d = 2 ** len(wires)
+    identity_weight = 1 / (d + 1) if z == 0 else 0.0
 
-    # High level idea: Take the identity operator on d^2 x d^2 and look at each row independently.
-    # When reshaped into a matrix, it gives exactly the matrix representation of |i><j|:
+    # Tr(X) 1/d on all cut wires, applied wire by wire
+    measure_prepare = [qml.DepolarizingChannel(3 / 4, wires=w, do_queue=False) for w in wires]
 
-    kraus0 = np.identity(d**2).reshape(d**2, d, d)
+    return identity_weight, measure_prepare
 
-    kraus0 = np.concatenate([kraus0, np.identity(d)[None, :, :]], axis=0)
-    # Add the identity op' to the mix
 
-    kraus0 /= np.sqrt(d + 1)  # Normalize
+######################################################################
+# Let's check on a random density matrix of three qubits that the
+# structured channel agrees with the Kraus operators from above:
+#
+
+dev_check = qml.device("default.mixed", wires=3)
+_, mp_ops = make_cut_channel(0, wires=range(3))
+
 
-    # Same trick for the other Kraus op'
-    kraus1 = np.identity(d**2).reshape(d**2, d, d)
-    kraus1 /= np.sqrt(d)
+@qml.qnode(dev_check)
+def measure_prepare(rho):
+    qml.QubitDensityMatrix(rho, wires=range(3))
+    for op in mp_ops:
+        qml.apply(op)
+    return qml.density_matrix(wires=range(3))
 
-    # Finally, return a list of NumPy arrays, as per `qml.QubitChannel` docs.
-    return list(kraus0.astype(complex)), list(kraus1.astype(complex))
 
+A = np.random.normal(size=(8, 8)) + 1j * np.random.normal(size=(8, 8))
+rho = A @ A.conj().T / np.trace(A @ A.conj().T)
+
+basis = np.identity(8)
+kraus_ops = [np.outer(basis[i], basis[j]) for i in range(8) for j in range(8)]
+kraus_psi0 = (sum(K @ rho @ K.conj().T for K in kraus_ops) + rho) / 9
+
+print(np.allclose(kraus_psi0, rho / 9 + 8 / 9 * measure_prepare(rho)))
 
 ######################################################################
-# Our next task is to generate two new ``QuantumTape`` objects from our
-# existing ``tape``, one for :math:`\Psi _0` and one for :math:`\Psi _1`.
-# Currently, a ``qml.WireCut`` dummy gate is used to represent the cut
-# position and size. So, iterating through gates in ``tape``:
-#
-# -  If the gate is a ``qml.WireCut``, we apply the ``qml.QubitChannel``
-#    corresponding to :math:`\Psi _0` or :math:`\Psi _1` to different new
-#    tapes.
+# Our next task is to generate new ``QuantumTape`` objects from our
+# existing ``tape``. Currently, a ``qml.WireCut`` dummy gate is used to
+# represent the cut position and size. Because :math:`\Psi _0` and
+# :math:`\Psi _1` only differ by the weight of their identity part, two
+# tapes suffice: ``tape_id``, in which the cut wires are left alone, and
+# ``tape_mp``, in which the ``qml.WireCut`` is replaced by the
+# measure-and-prepare operations. Iterating through gates in ``tape``:
+#
+# -  If the gate is a ``qml.WireCut``, we apply the measure-and-prepare
+#    operations to ``tape_mp`` only.
 # -  Otherwise, just apply the same existing gate to both new tapes.
 #
 # In code, this looks like:
 #
 
-with QuantumTape(do_queue=False) as tape0, QuantumTape(do_queue=False) as tape1:
+with QuantumTape(do_queue=False) as tape_id, QuantumTape(do_queue=False) as tape_mp:
     # Record on new "fragment" tapes
 
     for op in tape:
@@ -668,18 +837,15 @@ with QuantumTape(do_queue=False) as tape0, QuantumTape(do_queue=False) as tape1:
             k = len(op.wires)
             d = 2**k
 
-            K0, K1 = make_kraus_ops(k)  # Generate Kraus operators on the fly
+            identity_weight, mp_ops = make_cut_channel(0, op.wires)
             probs = (d + 1) / (2 * d + 1), d / (2 * d + 1)  # Probabilities of the two channels
 
-            psi_0 = qml.QubitChannel(K0, wires=op.wires, do_queue=False)
-            psi_1 = qml.QubitChannel(K1, wires=op.wires, do_queue=False)
-
-            qml.apply(psi_0, context=tape0)
-            qml.apply(psi_1, context=tape1)
+            for mp_op in mp_ops:
+                qml.apply(mp_op, context=tape_mp)
 
         else:  # Otherwise, just apply the existing gate
-            qml.apply(op, context=tape0)
-            qml.apply(op, context=tape1)
+            qml.apply(op, context=tape_id)
+            qml.apply(op, context=tape_mp)
 
 
 ######################################################################
@@ -689,11 +855,11 @@ with QuantumTape(do_queue=False) as tape0, QuantumTape(do_queue=False) as tape1:
 print(f"Cut size: k={k}")
 print(f"Channel probabilities: p0={probs[0]:.2f}; p1={probs[1]:.2f}", "\n")
 
-fig, _ = qml.drawer.tape_mpl(tape0, expansion_strategy="device")
+fig, _ = qml.drawer.tape_mpl(tape_mp, expansion_strategy="device")
 fig.set_size_inches(12, 6)
 
 ######################################################################
-# You may have noticed that both generarated tapes have the same size as
+# You may have noticed that the generarated tapes have the same size as
 # the original ``tape``. It may seem that no circuit cutting actually took
 # place. However, this is just an artifact of the way we chose to
 # represent **classical communication** between subcircuits.
@@ -709,21 +875,25 @@ fig.set_size_inches(12, 6)
 device = qml.device("default.mixed", wires=tape.wires)
 
 ######################################################################
-# We only need a single run each of the two generated tapes, ``tape0`` and
-# ``tape1``, collecting the appropriate number of samples. NumPy can
-# take care of this for us - we let ``np.choice`` make our decision on
-# which tape to run for each shot:
+# For every shot, we first decide which channel :math:`\Psi _z` to apply.
+# If it is :math:`\Psi _0`, we additionally decide whether to apply its
+# identity part, which happens with probability :math:`a_0 = 1/(d+1)`.
+# We then only need a single run each of the two generated tapes,
+# ``tape_id`` and ``tape_mp``, collecting the appropriate number of
+# samples. NumPy can take care of this for us - we let ``np.choice``
+# make our decision on which channel to run for each shot:
 #
 
 samples = np.zeros((n_shots, len(tape.wires)), dtype=int)
 
 rng = np.random.default_rng(seed=1337)
 choices = rng.choice(2, size=n_shots, p=probs)
+use_identity = (choices == 0) & (rng.random(n_shots) < identity_weight)
 
 channels, channel_shots = np.unique(choices, return_counts=True)
 
 print("Which channel to run:", choices)
-print(f"Channel 0: {channel_shots[0]} times")
+print(f"Channel 0: {channel_shots[0]} times, of which {np.sum(use_identity)} with the identity part")
 print(f"Channel 1: {channel_shots[1]} times.")
 
 
@@ -731,13 +901,13 @@ print(f"Channel 1: {channel_shots[1]} times.")
 # Time to run the simulator!
 #
 
-device.shots = channel_shots[0].item()
-(shots0,) = qml.execute([tape0], device=device, cache=False, gradient_fn=None)
-samples[choices == 0] = shots0
+device.shots = int(np.sum(use_identity))
+(shots_id,) = qml.execute([tape_id], device=device, cache=False, gradient_fn=None)
+samples[use_identity] = shots_id
 
-device.shots = channel_shots[1].item()
-(shots1,) = qml.execute([tape1], device=device, cache=False, gradient_fn=None)
-samples[choices == 1] = shots1
+device.shots = int(np.sum(~use_identity))
+(shots_mp,) = qml.execute([tape_mp], device=device, cache=False, gradient_fn=None)
+samples[~use_identity] = shots_mp
 
 ######################################################################
 # Now that we have the result stored in ``samples``, we still need to do
@@ -15,7 +15,7 @@ Quantum natural gradient
    tutorial_backprop Quantum gradients with backpropagation
    tutorial_vqe_qng Accelerating VQE with quantum natural gradient
 
-*Author: Josh Izaac — Posted: 11 October 2019. Last updated: 25 January 2021.*
+*Author: Josh Izaac — Posted: 11 October 2019. Last updated: 18 October 2026.*
 
 This example demonstrates the quantum natural gradient optimization technique
 for variational quantum circuits, originally proposed in
@@ -427,6 +427,176 @@ print(qml.metric_tensor(circuit, approx='diag')(params))
 # Furthermore, the returned metric tensor is **full differentiable**; include it
 # in your cost function, and train or optimize its value!
 
+##############################################################################
+# Computing the blocks from state snapshots
+# -----------------------------------------
+#
+# On a simulator, we can go one step further. All entries of the block
+# :math:`g^{(\ell)}` are expectation values of products of generators in the
+# *same* state :math:`|\psi_{\ell-1}\rangle`. If we have access to this state
+# vector, a single snapshot of it suffices to compute the whole block classically:
+#
+# .. math::
+#
+#     g_{ij}^{(\ell)} = \text{Re}\left(\langle K_i \psi_{\ell-1} | K_j \psi_{\ell-1}\rangle\right)
+#     - \langle \psi_{\ell-1} | K_i | \psi_{\ell-1}\rangle\langle \psi_{\ell-1} | K_j | \psi_{\ell-1}\rangle.
+#
+# Here, we include the prefactor of the generators in :math:`K_i`, e.g.,
+# :math:`K=-Z/2` for ``qml.RZ``, which accounts for the factor :math:`1/4` from above.
+# Moreover, the state before layer :math:`\ell` is obtained from the state before layer
+# :math:`\ell-1` by applying only the gates in between, so that we never need to
+# simulate the circuit from the start more than once.
+#
+# We begin by splitting the operations of a circuit into parametrized layers, together
+# with the fixed gates that need to be applied before each layer. As in
+# :func:`~.pennylane.metric_tensor`, a trainable gate belongs to the layer following
+# the latest layer it depends on. Fixed gates are moved as far back as possible, so
+# that gates acting on different wires may be reordered, but never gates acting on
+# the same wire.
+
+
+def parametrized_layers(tape):
+    """Split the operations of a tape into a prefix of fixed gates and a parametrized layer each."""
+    wire_level = {w: -1 for w in tape.wires}
+    keyed_ops = []
+    num_trainable = 0
+    for op in tape.operations:
+        level = max(wire_level[w] for w in op.wires)
+        trainable = any(qml.math.requires_grad(d) for d in op.data)
+        if trainable:
+            level += 1
+            keyed_ops.append(((level, 1), (num_trainable, op)))
+            num_trainable += 1
+        else:
+            keyed_ops.append(((level + 1, 0), (None, op)))
+        for w in op.wires:
+            wire_level[w] = level
+
+    # A stable sort keeps the order of the gates within each prefix and layer
+    keyed_ops.sort(key=lambda keyed_op: keyed_op[0])
+    num_layers = max(wire_level.values()) + 1
+    layers = [([], []) for _ in range(num_layers)]
+    for (level, trainable), (param_idx, op) in keyed_ops:
+        # Fixed gates after the last layer do not affect the metric tensor
+        if level < num_layers:
+            layers[level][trainable].append(op if param_idx is None else (param_idx, op))
+    return layers
+
+
+##############################################################################
+# For a single layer, the block follows from the state snapshot and the matrices
+# of the generators:
+
+
+def metric_block(state, ops, wire_order):
+    """Metric tensor block of a layer of gates, from the state before the layer."""
+    generators = [qml.generator(op, format="observable") for op in ops]
+    K_psi = np.array([qml.matrix(K, wire_order=wire_order) @ state for K in generators])
+    expvals = np.real(K_psi @ state.conj())
+    return np.real(K_psi.conj() @ K_psi.T) - np.outer(expvals, expvals)
+
+
+##############################################################################
+# The engine below ties this together. It evolves the state from layer to layer,
+# executing one circuit per layer that only contains the gates between two
+# snapshots. The snapshots are cached along with the parameters of the gates
+# that produced them, so that a subsequent call only re-simulates the circuit from
+# the first layer whose preceding gates have changed. Finally, with
+# ``refresh_every=k`` the metric tensor is only recomputed every :math:`k`-th call,
+# and the last result is returned otherwise.
+
+
+class BlockDiagMetricTensor:
+    """Block-diagonal metric tensor of a QNode from one state snapshot per layer.
+
+    Every trainable gate is assumed to have a single parameter, and the parameters of
+    the QNode are assumed to enter the circuit one per gate, in circuit order.
+    """
+
+    def __init__(self, qnode, refresh_every=1):
+        self.qnode = qnode
+        self.refresh_every = refresh_every
+        self.wire_order = qnode.device.wires
+        self.num_calls = 0
+        self.metric_tensor = None
+        self._snapshots = []
+
+    def _evolve(self, state, ops):
+        with qml.tape.QuantumTape() as tape:
+            qml.QubitStateVector(state, wires=self.wire_order)
+            for op in ops:
+                qml.apply(op)
+            qml.state()
+        return qml.execute([tape], self.qnode.device, gradient_fn=None)[0]
+
+    def __call__(self, *args, **kwargs):
+        self.num_calls += 1
+        if self.metric_tensor is not None and (self.num_calls - 1) % self.refresh_every:
+            return self.metric_tensor
+
+        self.qnode.construct(args, kwargs)
+        layers = parametrized_layers(self.qnode.tape)
+        num_params = sum(len(layer) for _, layer in layers)
+        metric_tensor = np.zeros((num_params, num_params))
+
+        state = np.zeros(2 ** len(self.wire_order), dtype=complex)
+        state[0] = 1.0
+        reuse_snapshots = True
+        for ell, (prefix, layer) in enumerate(layers):
+            # Gates between the previous snapshot and this one
+            segment = ([op for _, op in layers[ell - 1][1]] if ell > 0 else []) + prefix
+            segment_data = [np.array(d) for op in segment for d in op.data]
+
+            cached = ell < len(self._snapshots) and len(self._snapshots[ell][0]) == len(
+                segment_data
+            )
+            if reuse_snapshots and cached and all(
+                np.array_equal(d_old, d_new)
+                for d_old, d_new in zip(self._snapshots[ell][0], segment_data)
+            ):
+                state = self._snapshots[ell][1]
+            else:
+                reuse_snapshots = False
+                state = self._evolve(state, segment)
+                self._snapshots[ell:] = [(segment_data, state)]
+
+            param_idx = [idx for idx, _ in layer]
+            block = metric_block(state, [op for _, op in layer], self.wire_order)
+            metric_tensor[np.ix_(param_idx, param_idx)] = block
+
+        self.metric_tensor = metric_tensor
+        return metric_tensor
+
+
+##############################################################################
+# Let's check that the engine reproduces the block-diagonal metric tensor of
+# :func:`~.pennylane.metric_tensor`, and count the device executions
+# with a :class:`~.pennylane.Tracker`. Note that we track ``circuit.device``, as the QNode
+# may swap ``dev`` for a version of the device that supports backpropagation.
+# If we then change the parameters of the first layer, the snapshot before the first
+# layer is still valid, and only the snapshot before the second layer has to be
+# updated. Changing only the parameters of the second layer would even keep both
+# snapshots valid, as the metric tensor does not depend on the parameters of the
+# last layer.
+
+metric_engine = BlockDiagMetricTensor(circuit)
+
+with qml.Tracker(circuit.device) as tracker:
+    g_engine = metric_engine(params)
+print(np.round(g_engine, 8))
+print("Agrees with qml.metric_tensor:", np.allclose(g_engine, g))
+print("Executions, first call:", tracker.totals["executions"])
+
+new_params = params.copy()
+new_params[:2] += 0.1
+with qml.Tracker(circuit.device) as tracker:
+    g_engine = metric_engine(new_params)
+print("Executions, first layer changed:", tracker.totals["executions"])
+print(
+    "Agrees with qml.metric_tensor:",
+    np.allclose(g_engine, qml.metric_tensor(circuit, approx="block-diag")(new_params)),
+)
+
 ##############################################################################
 # Quantum natural gradient optimization
 # -------------------------------------
@@ -461,14 +631,32 @@ for _ in range(steps):
     theta = opt.step(circuit, theta)
     qng_cost.append(circuit(theta))
 
+##############################################################################
+# Performing quantum natural gradient descent with the snapshot engine from above,
+# recomputing the metric tensor only every 10 steps. As the metric tensor changes
+# slowly for small step sizes, this barely affects the optimization, while the
+# executions spent on the metric tensor drop by a factor of 10.
+
+qng_lagged_cost = []
+opt = qml.QNGOptimizer(0.01)
+metric_engine = BlockDiagMetricTensor(circuit, refresh_every=10)
+
+theta = init_params
+for _ in range(steps):
+    theta = opt.step(circuit, theta, metric_tensor_fn=metric_engine)
+    qng_lagged_cost.append(circuit(theta))
+
+print(f"Final cost, QNG: {qng_cost[-1]:.6f}, lagged QNG: {qng_lagged_cost[-1]:.6f}")
+
 
 ##############################################################################
-# Plotting the cost vs optimization step for both optimization strategies:
+# Plotting the cost vs optimization step for all optimization strategies:
 from matplotlib import pyplot as plt
 
 plt.style.use("seaborn")
 plt.plot(gd_cost, "b", label="Vanilla gradient descent")
 plt.plot(qng_cost, "g", label="Quantum natural gradient descent")
+plt.plot(qng_lagged_cost, "r--", label="QNG, metric tensor refreshed every 10 steps")
 
 plt.ylabel("Cost function value")
 plt.xlabel("Optimization steps")
@@ -9,7 +9,7 @@ Quanvolutional Neural Networks
         to classify MNIST images.
     :property="og:image": https://pennylane.ai/qml/_images/circuit.png
 
-*Author: Andrea Mari — Posted: 24 March 2020. Last updated: 15 January 2021.*
+*Author: Andrea Mari — Posted: 24 March 2020. Last updated: 18 October 2026.*
 
 In this demo we implement the *Quanvolutional Neural Network*, a quantum
 machine learning model originally introduced in
@@ -205,33 +205,114 @@ def quanv(image):
 # Later an entirely classical model will be directly trained and tested on the
 # pre-processed dataset, avoiding unnecessary repetitions of quantum computations.
 #
-# The pre-processed images will be saved in the folder ``SAVE_PATH``.
-# Once saved, they can be directly loaded by setting ``PREPROCESS = False``,
-# otherwise the quantum convolution is evaluated at each run of the code.
+# The ``quanv`` function above executes the circuit once for each of the :math:`196`
+# squares of an image. To pre-process larger datasets, we instead extract the squares
+# of many images at once by reshaping the image array, and feed all of them to the
+# circuit in a single broadcasted execution.
 
-if PREPROCESS == True:
-    q_train_images = []
+
+def extract_patches(images):
+    """Splits a batch of images into the flattened 2x2 squares processed by ``quanv``."""
+    n_images = len(images)
+    # (image, row, 2, column, 2) -> (image, row, column, 2, 2)
+    patches = np.reshape(images, (n_images, 14, 2, 14, 2)).transpose(0, 1, 3, 2, 4)
+    return np.reshape(patches, (n_images * 14 * 14, 4))
+
+
+def quanv_batch(images):
+    """Convolves a batch of images, processing all squares in one broadcasted execution."""
+    patches = extract_patches(images)
+    # the circuit returns one array of expectation values per channel
+    q_results = np.stack(circuit(patches.T), axis=-1)
+    return np.reshape(q_results, (len(images), 14, 14, 4))
+
+
+##############################################################################
+# Both functions produce the same output:
+
+print(np.allclose(quanv(train_images[0]), quanv_batch(train_images[:1])[0]))
+
+##############################################################################
+# The pre-processed images are saved in the folder ``SAVE_PATH``, in a file whose name
+# depends on the parameters of the random circuit. We split the dataset into chunks,
+# which can be distributed over a pool of worker processes by setting ``n_workers``.
+# Every finished chunk is directly written to a memory-mapped file, and marked as done.
+# If the pre-processing is interrupted, running it again will only compute the missing
+# chunks.
+#
+# Once saved, the images can be directly loaded by setting ``PREPROCESS = False``,
+# otherwise the quantum convolution is evaluated at each run of the code. Images saved
+# by earlier versions of this demo as ``q_train_images.npy`` and ``q_test_images.npy``
+# are still loaded if no file for the current circuit parameters exists.
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.format import open_memmap
+
+
+def feature_store_path(name):
+    """Location of the pre-processed images, keyed by the parameters of the quantum circuit."""
+    key = hashlib.sha1(np.asarray(rand_params).tobytes()).hexdigest()[:12]
+    return SAVE_PATH + "q_{}_{}.npy".format(name, key)
+
+
+def load_features(name):
+    """Loads the pre-processed images, falling back to the file names of earlier versions."""
+    path = feature_store_path(name)
+    if not os.path.exists(path):
+        path = SAVE_PATH + "q_{}_images.npy".format(name)
+    return np.load(path)
+
+
+def quantum_preprocess(images, name, chunk_size=10, n_workers=1):
+    """Applies ``quanv_batch`` to chunks of images, in a pool of worker processes if
+    ``n_workers > 1``, and stores the results in a resumable memory-mapped file."""
+    path = feature_store_path(name)
+    done_path = path.replace(".npy", "_done.npy")
+    n_chunks = int(np.ceil(len(images) / chunk_size))
+
+    shape = (len(images), 14, 14, 4)
+    features, done = None, None
+    if os.path.exists(path) and os.path.exists(done_path):
+        features = open_memmap(path, mode="r+")
+        done = np.load(done_path)
+    if features is None or features.shape != shape or done.shape != (n_chunks,):
+        # start from scratch if nothing was saved yet, or the dataset or chunks have changed
+        features = open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+        done = np.zeros(n_chunks, dtype=bool)
+
+    todo = [i for i in range(n_chunks) if not done[i]]
+    chunks = [images[i * chunk_size : (i + 1) * chunk_size] for i in todo]
+
+    executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    results = map(quanv_batch, chunks) if executor is None else executor.map(quanv_batch, chunks)
+    try:
+        for i, q_images in zip(todo, results):
+            features[i * chunk_size : (i + 1) * chunk_size] = q_images
+            features.flush()
+            done[i] = True
+            np.save(done_path, done)
+            print("{}/{} chunks        ".format(np.sum(done), n_chunks), end="\r")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return features
+
+
+# Worker processes may re-import this script, which must not start the pre-processing again
+if PREPROCESS == True and __name__ == "__main__":
     print("Quantum pre-processing of train images:")
-    for idx, img in enumerate(train_images):
-        print("{}/{}        ".format(idx + 1, n_train), end="\r")
-        q_train_images.append(quanv(img))
-    q_train_images = np.asarray(q_train_images)
+    quantum_preprocess(train_images, "train")
 
-    q_test_images = []
     print("\nQuantum pre-processing of test images:")
-    for idx, img in enumerate(test_images):
-        print("{}/{}        ".format(idx + 1, n_test), end="\r")
-        q_test_images.append(quanv(img))
-    q_test_images = np.asarray(q_test_images)
-
-    # Save pre-processed images
-    np.save(SAVE_PATH + "q_train_images.npy", q_train_images)
-    np.save(SAVE_PATH + "q_test_images.npy", q_test_images)
+    quantum_preprocess(test_images, "test")
 
 
 # Load pre-processed images
-q_train_images = np.load(SAVE_PATH + "q_train_images.npy")
-q_test_images = np.load(SAVE_PATH + "q_test_images.npy")
+q_train_images = load_features("train")
+q_test_images = load_features("test")
 
 ##############################################################################
 # Let us visualize the effect of the quantum convolution
@@ -14,7 +14,7 @@ Frugal shot optimization with Rosalin
    tutorial_doubly_stochastic Doubly stochastic gradient descent
    tutorial_rotoselect Quantum circuit structure learning
 
-*Author: Josh Izaac — Posted: 19 May 2020. Last updated: 30 January 2023.*
+*Author: Josh Izaac — Posted: 19 May 2020. Last updated: 18 October 2026.*
 
 In this tutorial we investigate and implement the Rosalin (Random Operator Sampling for
 Adaptive Learning with Individual Number of shots) from
@@ -487,13 +487,10 @@ class Rosalin:
 
         return g, s
 
-    def step(self, params):
-        """Perform a single step of the Rosalin optimizer."""
-        # keep track of the number of shots run
-        self.shots_used += int(2 * np.sum(self.s))
-
-        # compute the gradient, as well as the variance in the gradient,
-        # using the number of shots determined by the array s.
+    def compute_grad_var(self, params):
+        """Evaluate the gradient, as well as the variance in the gradient,
+        for all parameters, using the number of shots determined by the array s.
+        """
         grad = []
         S = []
 
@@ -508,6 +505,16 @@ class Rosalin:
 
         grad = np.reshape(np.stack(grad), params.shape)
         S = np.reshape(np.stack(S), params.shape)
+        return grad, S
+
+    def step(self, params):
+        """Perform a single step of the Rosalin optimizer."""
+        # keep track of the number of shots run
+        self.shots_used += int(2 * np.sum(self.s))
+
+        # compute the gradient, as well as the variance in the gradient,
+        # using the number of shots determined by the array s.
+        grad, S = self.compute_grad_var(params)
 
         # gradient descent update
         params = params - self.lr * grad
@@ -540,7 +547,7 @@ class Rosalin:
         ) / s
 
         argmax_gamma = np.unravel_index(np.argmax(gamma), gamma.shape)
-        smax = s[argmax_gamma]
+        smax = max(s[argmax_gamma], 2)
         self.s = np.clip(s, min(2, self.min_shots), smax)
 
         self.k += 1
@@ -625,6 +632,120 @@ plt.show()
 # approaching the ground state energy of the Hamiltonian with strikingly
 # fewer shots.
 #
+# Batching the shifted circuits
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#
+# While Rosalin is frugal with *shots*, our implementation above is not frugal with
+# *executions*: for every parameter, ``evaluate_grad_var`` calls ``estimate_hamiltonian``
+# twice, each of which creates a new device and QNode, and then executes one circuit per
+# sampled Hamiltonian term. On hardware with a fixed latency per job, or for ansätze with
+# many parameters, this quickly dominates the wall-clock time.
+#
+# However, the shot distribution for all parameters is already known at the start of a
+# step. We can therefore build the shifted tapes for all parameters and all sampled terms
+# up front, and submit them to a single device with ``qml.execute``.
+# Since a device executes all tapes of a batch with the same number of shots, we group
+# the tapes by the number of shots allocated to them, and execute one batch per group.
+# The shot counts are small integers shared by many tapes, so a step needs only a few
+# batches, and the device executes exactly the shots accounted for by the optimizer.
+
+
+class BatchedRosalin(Rosalin):
+
+    def __init__(self, obs, coeffs, min_shots, mu=0.99, b=1e-6, lr=0.07):
+        super().__init__(obs, coeffs, min_shots, mu=mu, b=b, lr=lr)
+        self.prob_shots = np.abs(coeffs) / np.sum(np.abs(coeffs))
+
+        # a single device is reused for all steps
+        self.device = qml.device("default.qubit", wires=num_wires, shots=100)
+
+    def compute_grad_var(self, params):
+        """Evaluate the gradient, as well as the variance in the gradient,
+        for all parameters by executing the shifted tapes in one batch per shot count.
+        """
+        p_ind = list(np.ndindex(*params.shape))
+
+        tapes = []
+        # for every tape, store the parameter index, the direction of
+        # the shift, the number of shots, and the rescaled coefficient
+        tape_info = []
+
+        for k, l in enumerate(p_ind):
+            shift = np.zeros_like(params)
+            shift[l] = np.pi / 2
+
+            # sample the shots per term independently for both shifts
+            shots_per_term = multinomial(n=int(self.s[l]), p=self.prob_shots).rvs(2)
+
+            for sign, shots in zip([1, -1], shots_per_term):
+                for o, c, p, s in zip(self.obs, self.coeffs, self.prob_shots, shots):
+                    # if the number of shots is 0, do nothing
+                    if s == 0:
+                        continue
+
+                    with qml.tape.QuantumTape() as tape:
+                        StronglyEntanglingLayers(params + sign * shift, wires=self.device.wires)
+                        qml.sample(o)
+
+                    tapes.append(tape)
+                    tape_info.append((k, (1 - sign) // 2, int(s), c / p))
+
+        # execute the tapes in groups with the same number of shots
+        results = [None] * len(tapes)
+        shot_counts = np.array([s for _, _, s, _ in tape_info])
+        for s in np.unique(shot_counts):
+            group = np.flatnonzero(shot_counts == s)
+            self.device.shots = int(s)
+            group_results = qml.execute([tapes[i] for i in group], self.device, gradient_fn=None)
+            for i, res in zip(group, group_results):
+                results[i] = res
+
+        # collect the single-shot estimates for the forward
+        # and backward shift of each parameter
+        estimates = [[[], []] for _ in p_ind]
+        for res, (k, direction, s, weight) in zip(results, tape_info):
+            estimates[k][direction].append(weight * np.reshape(res, -1))
+
+        grad = []
+        S = []
+
+        for shift_forward, shift_backward in estimates:
+            diff = (np.concatenate(shift_forward) - np.concatenate(shift_backward)) / 2
+            grad.append(np.mean(diff))
+            S.append(np.var(diff, ddof=1))
+
+        grad = np.reshape(np.stack(grad), params.shape)
+        S = np.reshape(np.stack(S), params.shape)
+        return grad, S
+
+
+##############################################################################
+# The update rule is inherited from ``Rosalin``, so both optimizers produce the same
+# gradient and variance estimates, and differ only in how the circuits are executed.
+# Let's compare the time per optimization step:
+
+import time
+
+for optimizer_class in [Rosalin, BatchedRosalin]:
+    np.random.seed(4)
+    opt = optimizer_class(obs, coeffs, min_shots=10)
+    params = init_params
+
+    start = time.perf_counter()
+    for i in range(10):
+        params = opt.step(params)
+    step_time = (time.perf_counter() - start) / 10
+
+    print(
+        f"{optimizer_class.__name__}: time per step = {step_time:.3f}s, "
+        f"cost = {cost_analytic(params):.3f}, shots used = {opt.shots_used}"
+    )
+
+##############################################################################
+# The batched optimizer replaces several hundred separate QNode evaluations per step
+# by a few batches, and the savings grow with the number of parameters and
+# Hamiltonian terms.
+#
 # While beyond the scope of this demonstration, the Rosalin optimizer can be
 # modified in various other ways; for instance, by incorporating *weighted hybrid
 # sampling* (which distributes some shots deterministically, with the remainder
@@ -16,7 +16,7 @@ Quantum circuit structure learning
    tutorial_vqe_qng Accelerating VQEs with quantum natural gradient
    tutorial_rosalin Frugal shot optimization with Rosalin
 
-*Author: Angus Lowe — Posted: 16 October 2019. Last updated: 20 January 2021.*
+*Author: Angus Lowe — Posted: 16 October 2019. Last updated: 18 October 2026.*
 
 """
 ##############################################################################
@@ -398,7 +398,7 @@ def rotoselect_cycle(cost, params, generators):
 costs_rsel = []
 params_rsel = init_params.copy()
 init_generators = np.array(["X", "Y"], requires_grad=False)
-generators = init_generators
+generators = init_generators.copy()
 for _ in range(n_steps):
     costs_rsel.append(cost_rsel(params_rsel, generators))
     params_rsel, generators = rotoselect_cycle(cost_rsel, params_rsel, generators)
@@ -456,6 +456,190 @@ ax.zaxis.set_major_locator(MaxNLocator(nbins=5, prune="lower"))
 plt.show()
 
 ##############################################################################
+# Batching the evaluations
+# ------------------------
+#
+# The helper methods above mutate ``params`` in place and evaluate the cost one
+# point at a time, so that a single cycle of Rotoselect sends
+# :math:`3\cdot P\cdot G` separate circuits (times the number of QNodes in the
+# cost function) to the device one after the other, for :math:`P` parameters
+# and :math:`G` candidate generators. However, none of the evaluations
+# required to update a parameter depend on each other: they only depend on the
+# values of the other parameters. We can therefore build all shifted circuits as
+# tapes up front and send them to the device in a single call to
+# :func:`~.pennylane.execute`, which allows simulators and hardware to execute
+# them as one batch.
+#
+# To do so, we measure the Hamiltonian directly in each tape, instead of splitting
+# it over two QNodes.
+
+H = qml.Hamiltonian([0.5, 0.8, -0.2], [qml.PauliY(1), qml.PauliZ(0), qml.PauliX(0)])
+
+
+def cost_tape(params, generators):
+    with qml.tape.QuantumTape() as tape:
+        ansatz_rsel(params, generators)
+        qml.expval(H)
+    return tape
+
+
+##############################################################################
+# Reconstructing the cost as a function of one parameter
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#
+# The closed-form expression for :math:`\theta^{*}_d` relies on the cost
+# being a sinusoid of :math:`\theta_d` with a single frequency. If a parameter
+# enters the circuit through :math:`R` rotation gates, the cost is instead a
+# trigonometric polynomial of degree :math:`R`,
+#
+# .. math:: \langle H \rangle_{\theta_d} = \sum_{k=-R}^{R} c_k e^{ik\theta_d},
+#
+# which is fully determined by its values at the :math:`2R+1` equidistant points
+# :math:`\theta_\mu = 2\pi\mu/(2R+1)`. The coefficients :math:`c_k` are the
+# discrete Fourier transform of these values. For :math:`R=1` the minimum is
+# found in closed form, as before, while for larger :math:`R` we evaluate the
+# reconstruction on a fine grid. In both cases, we also obtain the minimal
+# value of the cost, which we use to compare generators without evaluating the
+# circuit once more.
+#
+# Note that the first point, :math:`\theta_0=0`, is again shared by all
+# generator choices.
+
+
+def minimize_univariate(values, num_freq):
+    coeffs = np.fft.rfft(values) / len(values)
+    if num_freq == 1:
+        # <H> = c_0 + 2|c_1| cos(theta + arg(c_1))
+        theta = np.pi - np.angle(coeffs[1])
+        cost_min = np.real(coeffs[0]) - 2 * np.abs(coeffs[1])
+    else:
+        grid = np.linspace(-np.pi, np.pi, 100 * num_freq, endpoint=False)
+        freqs = np.arange(1, num_freq + 1)
+        recon = np.real(coeffs[0]) + 2 * np.real(np.exp(1j * np.outer(grid, freqs)) @ coeffs[1:])
+        theta, cost_min = grid[np.argmin(recon)], np.min(recon)
+    # restrict output to lie in [-pi, pi)
+    return (theta + np.pi) % (2 * np.pi) - np.pi, cost_min
+
+
+##############################################################################
+# A batched Rotoselect sweep
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~
+#
+# The sweep below supports two update orders. With ``jacobi=False`` the
+# parameters are updated one after the other, as in the original algorithm,
+# but all circuits needed for one parameter, i.e., all shifts for all
+# generators, form a single batch. With ``jacobi=True`` the generator search
+# for *all* parameters is carried out concurrently from the same point in
+# parameter space, and the whole sweep costs a single batch. The price is that
+# each update ignores the changes made to the other parameters in the same
+# sweep, so that more cycles may be needed for strongly coupled parameters.
+#
+# Passing ``gate_set=None`` keeps the generators fixed and recovers Rotosolve,
+# while ``num_freqs`` sets the number of frequencies :math:`R` of each
+# parameter.
+
+
+def rotoselect_sweep(
+    params, generators, num_freqs=1, gate_set=("X", "Y", "Z"), jacobi=True, device=dev
+):
+    params = np.array(params, requires_grad=False)
+    generators = list(generators)
+    num_freqs = np.broadcast_to(num_freqs, params.shape)
+    blocks = [list(range(len(params)))] if jacobi else [[d] for d in range(len(params))]
+
+    for block in blocks:
+        tapes = []
+        for d in block:
+            n_shifts = 2 * num_freqs[d] + 1
+            shifts = 2 * np.pi * np.arange(n_shifts) / n_shifts
+            candidates = [generators[d]] if gate_set is None else gate_set
+
+            # theta_d = 0 is independent of the generator selection
+            shifted = params.copy()
+            shifted[d] = 0.0
+            tapes.append(cost_tape(shifted, generators))
+            for generator in candidates:
+                shifted_gens = generators.copy()
+                shifted_gens[d] = generator
+                for shift in shifts[1:]:
+                    shifted = params.copy()
+                    shifted[d] = shift
+                    tapes.append(cost_tape(shifted, shifted_gens))
+
+        results = np.ravel(qml.execute(tapes, device, gradient_fn=None))
+
+        updates = []
+        start = 0
+        for d in block:
+            n_shifts = 2 * num_freqs[d]
+            candidates = [generators[d]] if gate_set is None else gate_set
+            M_0 = results[start]
+            start += 1
+            best = None
+            for generator in candidates:
+                values = np.concatenate([[M_0], results[start : start + n_shifts]])
+                start += n_shifts
+                theta, cost_min = minimize_univariate(values, num_freqs[d])
+                if best is None or cost_min < best[2]:
+                    best = (theta, generator, cost_min)
+            updates.append((d, best[0], best[1]))
+
+        for d, theta, generator in updates:
+            params[d] = theta
+            generators[d] = generator
+
+    return params, generators
+
+
+##############################################################################
+# We run both update orders from the initial parameters and generators used
+# above and keep track of the number of batches sent to the device as well as
+# the wall-clock time. For comparison, we also time the original sequential
+# implementation.
+
+import time
+
+results_rsel = {}
+
+start_time = time.time()
+params_seq, generators_seq = init_params.copy(), init_generators.copy()
+for _ in range(n_steps):
+    params_seq, generators_seq = rotoselect_cycle(cost_rsel, params_seq, generators_seq)
+# each parameter requires 10 calls to cost_rsel, each of which executes two QNodes
+num_calls = 2 * (1 + 3 * 3) * len(init_params) * n_steps
+results_rsel["sequential"] = (time.time() - start_time, num_calls)
+cost_seq = cost_rsel(params_seq, generators_seq)
+print(f"sequential: generators {generators_seq.tolist()}, final cost {cost_seq:.3f}")
+
+for jacobi in [False, True]:
+    start_time = time.time()
+    params_batch, generators_batch = init_params.copy(), list(init_generators)
+    for _ in range(n_steps):
+        params_batch, generators_batch = rotoselect_sweep(
+            params_batch, generators_batch, jacobi=jacobi
+        )
+    num_batches = n_steps if jacobi else len(init_params) * n_steps
+    name = "batched (Jacobi)" if jacobi else "batched (sequential)"
+    results_rsel[name] = (time.time() - start_time, num_batches)
+
+    cost_batch = cost_rsel(params_batch, generators_batch)
+    print(f"{name}: generators {generators_batch}, final cost {cost_batch:.3f}")
+
+print()
+print(f"{'update order':>22} | {'device calls':>12} | {'time (s)':>8}")
+for name, (duration, num_calls) in results_rsel.items():
+    print(f"{name:>22} | {num_calls:>12} | {duration:8.3f}")
+
+##############################################################################
+# All three variants reach the same minimal cost, up to shot noise, although
+# they may settle on different but equivalent choices of generators. The number
+# of separate calls to the device, however, drops from one per circuit
+# evaluation to one per parameter, or a single call per sweep with the Jacobi
+# update order. Since ``default.qubit`` simulates the tapes of a batch one after
+# the other, the difference in run time is modest here. On hardware, where every
+# call to the device comes with a queueing and compilation overhead, this is
+# where the savings of the batched optimizer are most pronounced.
+#
 # References
 # ----------
 #
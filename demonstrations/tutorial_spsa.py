@@ -14,7 +14,7 @@ Optimization using SPSA
    tutorial_vqe_qng Accelerating VQEs with quantum natural gradient
    qnspsa Quantum natural SPSA optimizer
 
-*Authors: Antal Szava & David Wierichs — Posted: 19 March 2021. Last updated: 23 February 2023.*
+*Authors: Antal Szava & David Wierichs — Posted: 19 March 2021. Last updated: 18 October 2026.*
 
 In this tutorial, we investigate using a stochastic optimizer called
 the Simultaneous Perturbation Stochastic Approximation (SPSA) algorithm to optimize quantum
@@ -492,6 +492,243 @@ plt.show()
 # In addition, the output still bounces around, which is due to shot noise
 # and the inherently stochastic nature of SPSA.
 #
+# Benchmarking optimizers on a budget
+# -----------------------------------
+#
+# So far, we counted the circuit executions by hand via ``execs_per_step``, which is
+# easy to get wrong, e.g., when the cost function has several terms or when an
+# optimizer evaluates the cost function for purposes other than the gradient
+# estimate. In addition, we ran the optimizers one after the other for a single
+# problem. To choose an optimizer for a real budget, we would rather compare
+# several optimizers across a range of problems and random seeds, in terms of
+# both circuit executions and wall time.
+#
+# Let's set up a small benchmark suite for this. Instead of computing the number of
+# executions, we let a :class:`~pennylane.Tracker` record the executions and shots
+# that actually reach the device. To make sure that monitoring the
+# optimization does not count towards the budget, we evaluate the cost for our records
+# on a separate, exact device. This also removes the shot noise from the recorded
+# cost values.
+#
+# In addition to SPSA and gradient descent, we include :class:`~pennylane.QNSPSAOptimizer`
+# and the shot-frugal :class:`~pennylane.ShotAdaptiveOptimizer` (Rosalin).
+
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+benchmark_ansatze = {
+    "StronglyEntangling": qml.StronglyEntanglingLayers,
+    "BasicEntangler": qml.BasicEntanglerLayers,
+}
+
+benchmark_optimizers = {
+    "SPSA": lambda seed: qml.SPSAOptimizer(maxiter=200, c=0.15, a=0.2),
+    "GD": lambda seed: qml.GradientDescentOptimizer(stepsize=0.3),
+    "QNSPSA": lambda seed: qml.QNSPSAOptimizer(stepsize=5e-2, seed=seed),
+    "Rosalin": lambda seed: qml.ShotAdaptiveOptimizer(min_shots=10),
+}
+
+
+def make_benchmark_problem(ansatz_name, num_wires, seed, num_layers=2, shots=1000):
+    """Create the cost function, an exact version of it for monitoring, and initial parameters."""
+    ansatz = benchmark_ansatze[ansatz_name]
+    observable = qml.prod(*[qml.PauliZ(i) for i in range(num_wires)])
+
+    def circuit(param):
+        ansatz(param, wires=range(num_wires))
+        return qml.expval(observable)
+
+    dev = qml.device("default.qubit", wires=num_wires, shots=shots)
+    exact_dev = qml.device("default.qubit", wires=num_wires)
+
+    rng = np.random.default_rng(seed)
+    param_shape = ansatz.shape(n_layers=num_layers, n_wires=num_wires)
+    init_param = np.array(rng.normal(scale=0.1, size=param_shape), requires_grad=True)
+
+    return qml.QNode(circuit, dev), qml.QNode(circuit, exact_dev), init_param
+
+
+##############################################################################
+# A single benchmark run optimizes one problem with one optimizer until the
+# device has executed a given number of circuits. After every step, we record a row
+# with the configuration, the number of executions and shots so far, the wall time
+# spent in the optimizer, and the exact cost. Collecting all of these rows yields a
+# *tidy* table with one observation per row, which is easy to filter and aggregate.
+
+
+def benchmark_run(optimizer_name, ansatz_name, num_wires, seed, max_executions):
+    """Run one optimizer on one problem until the execution budget is spent."""
+    # SPSA and the sampling on the device draw from NumPy's global random number
+    # generator, while QNSPSA takes the seed directly
+    np.random.seed(seed)
+    cost_function, exact_cost_function, param = make_benchmark_problem(
+        ansatz_name, num_wires, seed
+    )
+    opt = benchmark_optimizers[optimizer_name](seed)
+
+    rows = []
+    wall_time = 0.0
+    step = 0
+    with qml.Tracker(cost_function.device) as tracker, warnings.catch_warnings():
+        # QNSPSA warns that step() evaluates the cost for its blocking condition, and
+        # Rosalin divides by zero shots in its first step. Both are expected here, and
+        # the Tracker counts the additional executions of QNSPSA anyway.
+        if optimizer_name == "QNSPSA":
+            warnings.filterwarnings(
+                "ignore", message=r"step_and_cost\(\) instead of step\(\)", category=UserWarning
+            )
+        if optimizer_name == "Rosalin":
+            warnings.filterwarnings(
+                "ignore", message="invalid value encountered in divide", category=RuntimeWarning
+            )
+
+        while True:
+            executions = tracker.totals.get("executions", 0)
+            rows.append(
+                {
+                    "optimizer": optimizer_name,
+                    "ansatz": ansatz_name,
+                    "num_wires": num_wires,
+                    "seed": seed,
+                    "step": step,
+                    "executions": executions,
+                    "shots": tracker.totals.get("shots", 0),
+                    "wall_time": wall_time,
+                    "cost": float(exact_cost_function(param)),
+                }
+            )
+            if executions >= max_executions:
+                break
+
+            start = time.perf_counter()
+            param = opt.step(cost_function, param)
+            wall_time += time.perf_counter() - start
+            step += 1
+
+    return rows
+
+
+##############################################################################
+# The runs are independent of each other, so they can be distributed over a pool
+# of processes by setting ``n_workers``. To keep this demo quick, we run a small
+# matrix of optimizers, ansätze, qubit numbers and seeds one after the other, with a
+# budget of 500 executions per run. For a more thorough comparison, add more seeds
+# and qubit numbers, raise ``max_executions``, and set ``n_workers`` to the number of
+# available cores. When using several workers, run the benchmark from a script with
+# an ``if __name__ == "__main__":`` guard, as the worker processes may re-import it.
+
+
+def run_benchmark(optimizers, ansatze, wires, seeds, max_executions, n_workers=1):
+    """Run all combinations of the given settings and collect the results."""
+    configs = list(product(optimizers, ansatze, wires, seeds))
+    if n_workers == 1:
+        return [row for config in configs for row in benchmark_run(*config, max_executions)]
+
+    with ProcessPoolExecutor(n_workers) as executor:
+        futures = [executor.submit(benchmark_run, *config, max_executions) for config in configs]
+        return [row for future in futures for row in future.result()]
+
+
+benchmark_seeds = [0, 1]
+
+results = run_benchmark(
+    optimizers=list(benchmark_optimizers),
+    ansatze=list(benchmark_ansatze),
+    wires=[3, 4],
+    seeds=benchmark_seeds,
+    max_executions=500,
+)
+
+##############################################################################
+# To summarize the results, we aggregate the rows over the seeds. For every optimizer
+# and problem, we report the mean final cost and the total number of shots spent,
+# as well as the mean number of executions, shots and seconds needed to reach a cost
+# of :math:`-0.9`, if all seeds reached this target within the budget.
+
+
+def summarize(results, target=-0.9):
+    """Aggregate the benchmark results over the seeds."""
+    groups = {}
+    for row in results:
+        key = (row["optimizer"], row["ansatz"], row["num_wires"])
+        groups.setdefault(key, {}).setdefault(row["seed"], []).append(row)
+
+    summary = []
+    for (optimizer_name, ansatz_name, num_wires), runs in groups.items():
+        final_costs = [run[-1]["cost"] for run in runs.values()]
+        total_shots = [run[-1]["shots"] for run in runs.values()]
+        # First row of each run that reaches the target cost, if any
+        hits = [next((row for row in run if row["cost"] < target), None) for run in runs.values()]
+        reached = all(hit is not None for hit in hits)
+        summary.append(
+            {
+                "optimizer": optimizer_name,
+                "ansatz": ansatz_name,
+                "num_wires": num_wires,
+                "final_cost": np.mean(final_costs),
+                "total_shots": np.mean(total_shots),
+                "executions": np.mean([h["executions"] for h in hits]) if reached else np.nan,
+                "shots": np.mean([h["shots"] for h in hits]) if reached else np.nan,
+                "wall_time": np.mean([h["wall_time"] for h in hits]) if reached else np.nan,
+            }
+        )
+    return summary
+
+
+columns = {
+    "optimizer": "{:>9}",
+    "ansatz": "{:>18}",
+    "num_wires": "{:>9}",
+    "final_cost": "{:>10.3f}",
+    "total_shots": "{:>11.0f}",
+    "executions": "{:>10.0f}",
+    "shots": "{:>9.0f}",
+    "wall_time": "{:>9.2f}",
+}
+print(" | ".join(f"{column:>{len(fmt.format(0))}}" for column, fmt in columns.items()))
+for row in summarize(results):
+    print(" | ".join(fmt.format(row[column]) for column, fmt in columns.items()))
+
+##############################################################################
+# Finally, we plot the cost against the number of executions and against the wall
+# time for one of the problems, averaging the curves over the seeds.
+
+fig, (ax0, ax1) = plt.subplots(1, 2, figsize=(12, 5))
+for optimizer_name in benchmark_optimizers:
+    runs = [
+        [row for row in results if row["seed"] == seed and row["optimizer"] == optimizer_name]
+        for seed in benchmark_seeds
+    ]
+    runs = [
+        [row for row in run if row["ansatz"] == "StronglyEntangling" and row["num_wires"] == 4]
+        for run in runs
+    ]
+    # Truncate the runs to the same number of steps before averaging
+    num_steps = min(len(run) for run in runs)
+    mean_cost = np.mean([[row["cost"] for row in run[:num_steps]] for run in runs], axis=0)
+    mean_execs = np.mean([[row["executions"] for row in run[:num_steps]] for run in runs], axis=0)
+    mean_time = np.mean([[row["wall_time"] for row in run[:num_steps]] for run in runs], axis=0)
+    ax0.plot(mean_execs, mean_cost, label=optimizer_name)
+    ax1.plot(mean_time, mean_cost, label=optimizer_name)
+
+ax0.set_xlabel("Circuit executions", fontsize=14)
+ax1.set_xlabel("Wall time (s)", fontsize=14)
+for ax in (ax0, ax1):
+    ax.set_ylabel("Cost function value", fontsize=14)
+    ax.grid()
+    ax.legend(fontsize=12)
+plt.show()
+
+##############################################################################
+# Which optimizer comes out on top depends on the budget we care about: SPSA
+# spends only two executions per step, but needs many steps, while
+# Rosalin spends many executions per step, but only few shots on each of them,
+# so that it uses far fewer shots in total than the other optimizers.
+# Since the benchmark records executions, shots and wall time side by side, we can
+# pick the optimizer that fits the actual cost model of the hardware we run on.
+#
 # Conclusion
 # ----------
 #
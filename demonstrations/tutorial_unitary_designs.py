@@ -13,7 +13,7 @@ Unitary designs
 
     tutorial_haar_measure Understanding the Haar measure
 
-*Author: Olivia Di Matteo — Posted: 07 September 2021. Last updated: 07 September 2021.*
+*Author: Olivia Di Matteo — Posted: 07 September 2021. Last updated: 18 October 2026.*
 
 
 .. note::
@@ -433,11 +433,8 @@ single_qubit_cliffords = [
 
 import pennylane as qml
 
-# Scipy allows us to sample Haar-random unitaries directly
-from scipy.stats import unitary_group
-
-# set the random seed
-np.random.seed(42)
+# Batched sampling of Haar-random unitaries, as in the Haar measure demo
+from haar_sampling.haar_sampling import haar_unitaries
 
 # Use the mixed state simulator
 dev = qml.device("default.mixed", wires=1)
@@ -513,102 +510,111 @@ def conjugate_with_unitary(tape, matrix):
 ######################################################################
 # Finally, in order to perform a comparison, we need a function to compute the
 # `fidelity <https://en.wikipedia.org/wiki/Fidelity_of_quantum_states>`__
-# compared to the ideal operation.
+# compared to the ideal operation. In general, the fidelity of two density
+# matrices :math:`\rho` and :math:`\sigma` is
+# :math:`\hbox{Tr}\sqrt{\sqrt{\sigma}\rho\sqrt{\sigma}}`, which involves
+# matrix square roots. Our ideal experiment, however, outputs a pure state
+# :math:`\rho = \vert \psi \rangle \langle \psi \vert`, and in that case the
+# fidelity reduces to
+#
+# .. math::
+#
+#    \sqrt{\langle \psi \vert \sigma \vert \psi \rangle} = \sqrt{\hbox{Tr}(\rho\sigma)}.
+#
+# This function, and the others we use for twirling below, can be found in the
+# :download:`twirling.py </demonstrations/twirling/twirling.py>` module.
 
-from scipy.linalg import sqrtm
+from twirling.twirling import pure_state_fidelity
 
-def fidelity(rho, sigma):
-    # Inputs rho and sigma are density matrices
-    sqrt_sigma = sqrtm(sigma)
-    fid = np.trace(sqrtm(sqrt_sigma @ rho @ sqrt_sigma))
-    return fid.real
+######################################################################
+# Let's run the experiment once, for a single Haar-random unitary:
+
+U = haar_unitaries(2, rng=42)
+
+ideal_qnode = qml.QNode(conjugate_with_unitary(U)(ideal_experiment), dev)
+noisy_qnode = qml.QNode(conjugate_with_unitary(U)(noisy_experiment), dev)
+
+print(pure_state_fidelity(ideal_qnode(), noisy_qnode()))
 
 ######################################################################
-# Let's now compute the average fidelity, averaging over 50000 Haar-random unitaries:
+# To estimate the average fidelity, we'll need tens of thousands of such
+# experiments. Rather than constructing and executing two QNodes for every
+# unitary, we express the whole experiment in terms of matrices, and compute it
+# for a batch of unitaries at once. The :math:`\sqrt{X}` gate is a fixed
+# unitary, and the noise is a fixed channel, whose Kraus operators we obtain
+# from PennyLane:
 
-n_samples = 50000
+from twirling.twirling import adjoint, apply_kraus, compose_kraus, conjugate
 
-fidelities = []
+sx = qml.matrix(qml.SX(wires=0))
 
-for _ in range(n_samples):
-    # Select a Haar-random unitary
-    U = unitary_group.rvs(2)
+noise_kraus = compose_kraus(
+    qml.AmplitudeDamping(damp_factor, wires=0).kraus_matrices(),
+    qml.DepolarizingChannel(depo_factor, wires=0).kraus_matrices(),
+    qml.BitFlip(flip_prob, wires=0).kraus_matrices(),
+)
 
-    # Apply transform to construct the ideal and noisy quantum functions
-    conjugated_ideal_experiment = conjugate_with_unitary(U)(ideal_experiment)
-    conjugated_noisy_experiment = conjugate_with_unitary(U)(noisy_experiment)
+initial_state = np.array([[1, 0], [0, 0]])
 
-    # Use the functions to create QNodes
-    ideal_qnode = qml.QNode(conjugated_ideal_experiment, dev)
-    noisy_qnode = qml.QNode(conjugated_noisy_experiment, dev)
+def twirled_fidelities(unitaries):
+    """Fidelities of the noisy experiment conjugated by each of a batch of unitaries."""
+    # Apply U, then the square root of X
+    states = conjugate(conjugate(initial_state, unitaries), sx)
 
-    # Execute the QNodes
-    ideal_state = ideal_qnode()
-    noisy_state = noisy_qnode()
+    # Apply the noise only to the noisy experiment, and U^dagger to both
+    ideal_states = conjugate(states, adjoint(unitaries))
+    noisy_states = conjugate(apply_kraus(states, noise_kraus), adjoint(unitaries))
 
-    # Compute the fidelity
-    fidelities.append(fidelity(ideal_state, noisy_state))
+    return pure_state_fidelity(ideal_states, noisy_states)
 
-fid_mean = np.mean(fidelities)
-print(f"Mean fidelity = {fid_mean}")
+print(twirled_fidelities(U[np.newaxis]))
 
 ######################################################################
-# Now let's repeat the procedure using only Clifford group elements. First, we
-# write a quantum function that performs a Clifford operation (or its inverse)
-# based on its string representation.
-
-def apply_single_clifford(clifford_string, inverse=False):
-    for gate in clifford_string:
-        if gate == 'H':
-            qml.Hadamard(wires=0)
-        else:
-            sign = -1 if inverse else 1
-            qml.PhaseShift(sign * np.pi/2, wires=0)
+# The results agree. Let's now compute the average fidelity over up to 50000
+# Haar-random unitaries. We draw them in batches, and keep track of the
+# standard error of the mean after each batch to monitor how the estimate
+# converges:
 
-######################################################################
-# Next, we write a transform that applies a Clifford in the context of the full
-# experiment, i.e., apply the Clifford, then the operations, followed by the
-# inverse of the Clifford.
+from twirling.twirling import monitored_average
 
-@qml.qfunc_transform
-def conjugate_with_clifford(tape, clifford_string):
-    apply_single_clifford(clifford_string, inverse=False)
+n_samples = 50000
 
-    for op in tape.operations:
-        qml.apply(op)
+rng = np.random.default_rng(42)
 
-    apply_single_clifford(clifford_string, inverse=True)
+def haar_fidelities(batch_size):
+    return twirled_fidelities(haar_unitaries(2, batch_size, rng=rng))
 
-    for m in tape.measurements:
-        qml.apply(m)
+fid_mean, fid_error, history = monitored_average(haar_fidelities, n_samples, batch_size=5000)
+
+for num_samples, mean, error in history[1::2]:
+    print(f"{num_samples:5d} samples: mean fidelity = {mean:.6f} ± {error:.6f}")
 
 ######################################################################
-# You may have noticed this transform has exactly the same form as
-# ``conjugate_with_unitary`` from above. Only the input type has changed, since
-# the application of Cliffords here is specified by their string representation.
+# The standard error shrinks only with the square root of the number of
+# samples, so every additional digit of precision costs a hundred times more
+# experiments. Passing ``tol`` to ``monitored_average`` stops the sampling as
+# soon as a desired precision is reached.
 #
-# It's now time to run the experiments:
+# Now let's repeat the procedure using only Clifford group elements. Since each
+# Clifford is specified by a string of :math:`H` and :math:`S` gates, we
+# multiply out their matrices once, in the order in which the gates are applied:
 
-fidelities = []
+from twirling.twirling import clifford_matrices
 
-for C in single_qubit_cliffords:
-    conjugated_ideal_experiment = conjugate_with_clifford(C)(ideal_experiment)
-    conjugated_noisy_experiment = conjugate_with_clifford(C)(noisy_experiment)
+clifford_unitaries = clifford_matrices(single_qubit_cliffords)
 
-    ideal_qnode = qml.QNode(conjugated_ideal_experiment, dev)
-    noisy_qnode = qml.QNode(conjugated_noisy_experiment, dev)
-
-    ideal_state = ideal_qnode()
-    noisy_state = noisy_qnode()
+######################################################################
+# As ``twirled_fidelities`` accepts any stack of unitaries, running the 24
+# experiments is a single call:
 
-    fidelities.append(fidelity(ideal_state, noisy_state))
+fidelities = twirled_fidelities(clifford_unitaries)
 
 ######################################################################
 # Let's see how our results compare to the earlier simulation:
 
 clifford_fid_mean = np.mean(fidelities)
 
-print(f"Haar-random mean fidelity = {fid_mean}")
+print(f"Haar-random mean fidelity = {fid_mean} ± {fid_error}")
 print(f"Clifford mean fidelity    = {clifford_fid_mean}")
 
 ######################################################################
@@ -0,0 +1,93 @@
+""" Batched twirling of single-qubit experiments and average fidelities.
+
+Density matrices and unitaries are handled as stacks of shape (batch, 2, 2), so
+that the conjugations of an experiment by all elements of a design, or by a large
+batch of Haar-random unitaries, are computed with a few calls to ``np.einsum``
+instead of one circuit execution per element. Noisy channels are given by their
+Kraus operators, and fidelities with pure states are evaluated in closed form.
+"""
+import numpy as np
+
+HADAMARD = np.array([[1, 1], [1, -1]]) / np.sqrt(2)
+PHASE = np.array([[1, 0], [0, 1j]])
+
+
+def clifford_matrices(clifford_strings):
+    """Matrices of single-qubit Clifford operations given as strings of H and S.
+    Args:
+        clifford_strings (list[str]) : gate sequences, applied from left to right
+    Returns:
+        array[complex]               : matrices of shape (len(clifford_strings), 2, 2)
+    """
+    gates = {"H": HADAMARD, "S": PHASE}
+    matrices = np.array([np.eye(2, dtype=complex)] * len(clifford_strings))
+    for i, clifford_string in enumerate(clifford_strings):
+        for gate in clifford_string:
+            matrices[i] = gates[gate] @ matrices[i]
+    return matrices
+
+
+def adjoint(matrices):
+    """Conjugate transpose of the last two axes."""
+    return np.conj(np.swapaxes(matrices, -1, -2))
+
+
+def conjugate(rhos, unitaries):
+    """Compute U rho U^dagger, broadcasting over the leading axes of both inputs,
+    e.g., a single density matrix conjugated by a batch of unitaries."""
+    return np.einsum("...ij,...jk,...lk->...il", unitaries, rhos, np.conj(unitaries))
+
+
+def apply_kraus(rhos, kraus_ops):
+    """Apply the channel sum_k K_k rho K_k^dagger to a batch of density matrices."""
+    kraus_ops = np.asarray(kraus_ops)
+    return np.einsum("kij,...jl,kml->...im", kraus_ops, rhos, np.conj(kraus_ops))
+
+
+def compose_kraus(*channels):
+    """Kraus operators of a sequence of channels, the first one being applied first.
+    Args:
+        channels (list[array]) : Kraus operators of each channel
+    Returns:
+        array[complex]         : Kraus operators K_n ... K_1 of the composed channel
+    """
+    composed = np.eye(2, dtype=complex)[np.newaxis]
+    for kraus_ops in channels:
+        composed = np.einsum("aij,bjk->abik", np.asarray(kraus_ops), composed)
+        composed = composed.reshape(-1, 2, 2)
+    return composed
+
+
+def pure_state_fidelity(rhos, sigmas):
+    """Fidelity Tr[sqrt(sqrt(sigma) rho sqrt(sigma))] of batches of density matrices,
+    where each rho is pure. It then reduces to sqrt(Tr(rho sigma)), which needs no
+    matrix square roots."""
+    overlaps = np.einsum("...ij,...ji->...", rhos, sigmas).real
+    return np.sqrt(np.clip(overlaps, 0, None))
+
+
+def monitored_average(sample_fn, max_samples, batch_size=10000, tol=None):
+    """Average of independent samples drawn in batches, monitoring its convergence.
+    Args:
+        sample_fn (callable) : function returning an array of ``n`` samples when called as ``sample_fn(n)``
+        max_samples (int)    : maximal number of samples
+        batch_size (int)     : number of samples drawn at once
+        tol (float)          : stop as soon as the standard error of the mean is below tol
+    Returns:
+        tuple[float, float, list] : mean, its standard error, and the tuples
+                                    (number of samples, mean, standard error) after each batch
+    """
+    num_samples, total, total_sq = 0, 0.0, 0.0
+    history = []
+    while num_samples < max_samples:
+        samples = sample_fn(min(batch_size, max_samples - num_samples))
+        num_samples += len(samples)
+        total += np.sum(samples)
+        total_sq += np.sum(samples**2)
+
+        mean = total / num_samples
+        variance = max(total_sq / num_samples - mean**2, 0) / max(num_samples - 1, 1)
+        history.append((num_samples, mean, np.sqrt(variance)))
+        if tol is not None and history[-1][2] < tol:
+            break
+    return history[-1][1], history[-1][2], history
@@ -0,0 +1,96 @@
+""" Cross-entropy benchmarking scores for random circuit sampling.
+
+Samples are handled as integer indices of computational basis states, with the
+first wire as the most significant bit, matching the ordering of ``qml.probs``.
+Sampled bitstrings are converted with ``bitstrings_to_int`` from the
+``graph_objectives`` module.
+All scores of a circuit instance are computed in a single pass over the ideal
+probabilities of the samples, and samples can be streamed in chunks, so that the
+samples of an instance never need to be held in memory at once.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+EULER_GAMMA = 0.5772156649015329
+
+
+class XEBAccumulator:
+    """ Streaming estimator of the cross-entropy benchmarking scores of a single
+    circuit instance.
+
+    Args:
+        probs (array[float]) : ideal output probabilities of the circuit instance
+    """
+
+    def __init__(self, probs):
+        self.probs = np.asarray(probs, dtype=float)
+        self.dim = len(self.probs)
+
+        # Heavy outputs are those above the median of the ideal distribution
+        half = self.dim // 2
+        self.median = np.partition(self.probs, [half - 1, half])[half - 1 : half + 1].mean()
+
+        self.num_samples = 0
+        self.sum_probs = 0.0
+        self.sum_log_probs = 0.0
+        self.num_heavy = 0
+
+    def update(self, samples):
+        """Add a chunk of samples, given as integer indices."""
+        sampled_probs = self.probs[np.asarray(samples, dtype=np.int64)]
+
+        self.num_samples += len(sampled_probs)
+        self.sum_probs += np.sum(sampled_probs)
+        # Outputs with zero ideal probability contribute the smallest positive float
+        self.sum_log_probs += np.sum(np.log(np.maximum(sampled_probs, np.finfo(float).tiny)))
+        self.num_heavy += np.count_nonzero(sampled_probs > self.median)
+        return self
+
+    @property
+    def scores(self):
+        """Linear XEB fidelity, logarithmic XEB fidelity, and heavy output
+        generation (HOG) score of all samples added so far."""
+        mean_prob = self.sum_probs / self.num_samples
+        mean_log_prob = self.sum_log_probs / self.num_samples
+        return {
+            "linear": self.dim * mean_prob - 1,
+            "log": np.log(self.dim) + EULER_GAMMA + mean_log_prob,
+            "hog": self.num_heavy / self.num_samples,
+            "samples": self.num_samples,
+        }
+
+
+def xeb_scores(samples, probs, chunk_size=None):
+    """Cross-entropy benchmarking scores of samples of a circuit instance.
+    Args:
+        samples (array[int])  : samples given as integer indices
+        probs (array[float])  : ideal output probabilities of the circuit instance
+        chunk_size (int)      : number of samples processed at once, all of them by default
+    Returns:
+        dict                  : linear XEB, log-XEB and HOG scores, and the number of samples
+    """
+    samples = np.asarray(samples)
+    chunk_size = chunk_size or len(samples)
+    accumulator = XEBAccumulator(probs)
+    for start in range(0, len(samples), chunk_size):
+        accumulator.update(samples[start : start + chunk_size])
+    return accumulator.scores
+
+
+def instance_seeds(entropy, num_instances):
+    """Independent, reproducible 32-bit seeds for a number of circuit instances.
+    Every instance gets a pair of seeds: one that determines the circuit, and one
+    for sampling from it."""
+    seed_sequences = np.random.SeedSequence(entropy).spawn(num_instances)
+    return [tuple(int(seed) for seed in s.generate_state(2)) for s in seed_sequences]
+
+
+def run_instances(instance_fn, seeds, max_workers=1):
+    """Evaluate ``instance_fn(seeds)`` for the seeds of all instances, on a pool of
+    worker processes if ``max_workers > 1``. The results are returned in the order
+    of the instances."""
+    if max_workers == 1:
+        return [instance_fn(seed) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(instance_fn, seeds))